@@ -0,0 +1,124 @@
+"""
+UMKM Forecasting Backtesting
+Rolling-origin evaluation of the candidate models on one feature panel
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import mean_absolute_error, mean_squared_error, mean_absolute_percentage_error
+
+from training import FEATURE_COLS, build_models, prepare_training_frame
+
+# Back-to-back test windows ending at the last date of the data
+BACKTEST_ORIGINS = 4
+BACKTEST_HORIZON_DAYS = 30
+
+# Fold models are capped at this many trees / boosting rounds (boosted
+# models get a proportionally larger learning rate) so a backtest costs
+# about one full training; None fits the candidates as configured
+BACKTEST_MAX_ROUNDS = 50
+
+def rolling_origins(dates, n_origins=BACKTEST_ORIGINS, horizon=BACKTEST_HORIZON_DAYS):
+    """First day of each of ``n_origins`` consecutive ``horizon``-day test windows"""
+    end = pd.Timestamp(dates.max()).normalize() + pd.Timedelta(days=1)
+    return [end - pd.Timedelta(days=horizon * k) for k in range(n_origins, 0, -1)]
+
+def fold_model(model, max_rounds=BACKTEST_MAX_ROUNDS):
+    """Unfitted single-core copy of ``model`` with at most ``max_rounds`` rounds"""
+    model = clone(model)
+    params = model.get_params()
+    n_estimators = params.get('n_estimators')
+    if max_rounds and n_estimators and n_estimators > max_rounds:
+        updates = {'n_estimators': max_rounds}
+        if params.get('learning_rate'):
+            updates['learning_rate'] = min(1.0, params['learning_rate'] * n_estimators / max_rounds)
+        model.set_params(**updates)
+    if 'n_jobs' in params:
+        model.set_params(n_jobs=1)
+    return model
+
+def fold_metrics(y_true, y_pred):
+    """MAE / RMSE / MAPE of one fold"""
+    return {
+        'mae': float(mean_absolute_error(y_true, y_pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        'mape': float(mean_absolute_percentage_error(y_true, y_pred) * 100)
+    }
+
+def fit_fold(model, X, y, train_rows, test_rows):
+    """Fit ``model`` on ``train_rows`` and score it on ``test_rows``"""
+    model.fit(X[train_rows], y[train_rows])
+    return fold_metrics(y[test_rows], np.maximum(model.predict(X[test_rows]), 0))
+
+def backtest_models(features, models, n_origins=BACKTEST_ORIGINS, horizon=BACKTEST_HORIZON_DAYS,
+                    max_rounds=BACKTEST_MAX_ROUNDS, n_jobs=None):
+    """Rolling-origin backtest of ``models`` on a prepared feature frame.
+    
+    Each origin trains on every row dated before it (expanding window)
+    and tests on the following ``horizon`` days. The frame is converted
+    to one float32 matrix and each fold is a set of row indices into
+    it; all (model, fold) fits run on a ``joblib`` process pool with
+    ``n_jobs`` workers (default: all cores). Lag features are causal and
+    the imputation medians come from the training split, so origins
+    after the training split see no future values.
+    
+    Returns a JSON-safe report with per-fold and aggregate metrics.
+    """
+    start = time.perf_counter()
+    X = features[FEATURE_COLS].to_numpy(dtype=np.float32)
+    y = features['sold'].to_numpy(dtype=np.float64)
+    dates = features['date'].to_numpy()
+    
+    folds = []
+    for origin in rolling_origins(features['date'], n_origins, horizon):
+        train_rows = np.flatnonzero(dates < origin.to_datetime64())
+        test_rows = np.flatnonzero(
+            (dates >= origin.to_datetime64()) & (dates < (origin + pd.Timedelta(days=horizon)).to_datetime64())
+        )
+        if len(train_rows) and len(test_rows):
+            folds.append((origin, train_rows, test_rows))
+    if not folds:
+        raise ValueError("Not enough history for the requested backtest origins")
+    
+    tasks = [(name, fold) for name in models for fold in folds]
+    scores = Parallel(n_jobs=n_jobs or os.cpu_count() or 1, backend='loky')(
+        delayed(fit_fold)(fold_model(models[name], max_rounds), X, y, train_rows, test_rows)
+        for name, (_, train_rows, test_rows) in tasks
+    )
+    
+    per_fold = {name: [] for name in models}
+    for (name, (origin, train_rows, test_rows)), metrics in zip(tasks, scores):
+        per_fold[name].append({
+            'origin': origin.strftime('%Y-%m-%d'),
+            'train_rows': int(len(train_rows)),
+            'test_rows': int(len(test_rows)),
+            **metrics
+        })
+    
+    aggregate = {}
+    for name, results in per_fold.items():
+        aggregate[name] = {
+            metric: float(np.mean([fold[metric] for fold in results]))
+            for metric in ('mae', 'rmse', 'mape')
+        }
+        aggregate[name]['mae_std'] = float(np.std([fold['mae'] for fold in results]))
+    
+    return {
+        'origins': len(folds),
+        'horizon_days': horizon,
+        'max_rounds': max_rounds,
+        'best_model': min(aggregate, key=lambda name: aggregate[name]['mae']),
+        'aggregate': aggregate,
+        'folds': per_fold,
+        'seconds': round(time.perf_counter() - start, 2)
+    }
+
+def backtest_dataset(df_raw, model_params=None, **options):
+    """Build the feature panel for a daily frame and backtest the candidates on it"""
+    features = prepare_training_frame(df_raw)['features']
+    return backtest_models(features, build_models(model_params), **options)
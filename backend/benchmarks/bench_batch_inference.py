@@ -0,0 +1,72 @@
+"""
+Benchmark: batch inference
+Compares one DataFrame predict per request with inference.predict_batch
+
+Usage: python backend/benchmarks/bench_batch_inference.py [path/to/data.csv]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from ingest import parse_csv
+from training import run_training
+from inference import predict_batch
+
+DEFAULT_CSV = os.path.join(BACKEND_DIR, '..', 'data', 'catatan_umkm.csv')
+
+def per_request(requests, sessions, rows):
+    """Baseline: one single-row DataFrame predict per request"""
+    predictions = []
+    for request in requests:
+        session = sessions[request['session_id']]
+        row = rows[(rows['product_name'] == request['product']) & (rows['date'] == request['date'])]
+        predictions.append(float(session['best_model'].predict(row[session['feature_cols']])[0]))
+    return predictions
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CSV
+    with open(path, 'rb') as f:
+        df_raw = parse_csv(f.read())
+    
+    print("Training one session...")
+    session_updates, response = run_training(df_raw)
+    session = {'df_raw': df_raw, 'dataset_digest': 'bench', **session_updates}
+    print(f"Best model: {response['best_model']}")
+    
+    # Several sessions over the same trained state, like shops sharing a model
+    sessions = {f'session_{i}': session for i in range(4)}
+    rows = session['features']
+    rng = np.random.default_rng(0)
+    
+    print(f"{'rows':>8} {'loop (s)':>10} {'batch (s)':>10} {'batch rows/s':>14} {'speedup':>8} {'same':>5}")
+    for n in [1, 100, 10_000]:
+        picks = rows.iloc[rng.integers(0, len(rows), n)]
+        requests = [
+            {'session_id': f'session_{i % 4}', 'product': product, 'date': date.strftime('%Y-%m-%d')}
+            for i, (product, date) in enumerate(zip(picks['product_name'], picks['date']))
+        ]
+        
+        # The loop is slow, so time it on at most 200 requests and scale up
+        sample = requests[:200]
+        start = time.perf_counter()
+        expected = per_request(sample, sessions, rows)
+        t_loop = (time.perf_counter() - start) * n / len(sample)
+        
+        predict_batch(requests, sessions)
+        start = time.perf_counter()
+        results, stats = predict_batch(requests, sessions)
+        t_batch = time.perf_counter() - start
+        
+        got = [result['predicted'] for result in results[:len(sample)]]
+        same = bool(np.allclose(got, expected, rtol=1e-6))
+        print(f"{n:>8} {t_loop:>10.4f} {t_batch:>10.4f} {n / t_batch:>14.0f} "
+              f"{t_loop / t_batch:>7.1f}x {str(same):>5}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark: compiled tree inference
+Compares each model's predict with its compiled_trees export on 1-16 rows
+
+Usage: python backend/benchmarks/bench_compiled_inference.py [path/to/data.csv]
+"""
+
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from ingest import parse_csv
+from training import run_training
+from compiled_trees import compile_model
+
+DEFAULT_CSV = os.path.join(BACKEND_DIR, '..', 'data', 'catatan_umkm.csv')
+
+def latencies(fn, calls):
+    """Per-call wall times in milliseconds"""
+    fn()
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.array(timings)
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CSV
+    with open(path, 'rb') as f:
+        df_raw = parse_csv(f.read())
+    warnings.filterwarnings('ignore')
+    
+    print("Training...")
+    session_updates, _ = run_training(df_raw)
+    feature_cols = session_updates['feature_cols']
+    rows = session_updates['features']
+    X = rows[feature_cols].to_numpy(dtype=np.float32)
+    
+    print(f"{'model':>18} {'rows':>5} {'native p50':>11} {'native p99':>11} "
+          f"{'compiled p50':>13} {'compiled p99':>13} {'max diff':>9}")
+    for name, model in session_updates['models'].items():
+        compiled = compile_model(model)
+        diff = np.abs(model.predict(X) - compiled.predict(X)).max()
+        for n in [1, 4, 16]:
+            frame = rows[feature_cols].iloc[:n]
+            native = latencies(lambda: model.predict(frame), 100)
+            fast = latencies(lambda: compiled.predict(X[:n]), 1000)
+            print(f"{name:>18} {n:>5} {np.percentile(native, 50):>9.3f}ms {np.percentile(native, 99):>9.3f}ms "
+                  f"{np.percentile(fast, 50):>11.3f}ms {np.percentile(fast, 99):>11.3f}ms {diff:>9.1e}")
+
+if __name__ == "__main__":
+    main()
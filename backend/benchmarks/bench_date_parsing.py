@@ -0,0 +1,51 @@
+"""
+Benchmark: upload date parsing
+Compares pd.to_datetime(format='mixed') with date_parsing.parse_dates
+
+Usage: python backend/benchmarks/bench_date_parsing.py [path/to/data.csv]
+"""
+
+import os
+import sys
+import time
+
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from date_parsing import parse_dates
+
+DEFAULT_CSV = os.path.join(BACKEND_DIR, '..', 'data', 'catatan_umkm.csv')
+
+def best_of(fn, repeats=5):
+    """Best wall time of ``repeats`` runs, in seconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CSV
+    dates = pd.read_csv(path, usecols=['date'])['date']
+    
+    print(f"{'rows':>10} {'unique':>8} {'mixed (s)':>10} {'fast (s)':>10} {'speedup':>8} {'same':>5}")
+    for factor in [1, 10, 50]:
+        values = pd.concat([dates] * factor, ignore_index=True)
+        
+        mixed = pd.to_datetime(values, format='mixed', dayfirst=True, errors='coerce')
+        fast = parse_dates(values)
+        # ISO strings are the one intended difference, see parse_dates
+        iso = values.str.match(r'^\d{4}-\d{2}-\d{2}', na=False)
+        mixed, fast = mixed[~iso], fast[~iso]
+        same = bool(((mixed == fast) | (mixed.isna() & fast.isna())).all())
+        
+        t_mixed = best_of(lambda: pd.to_datetime(values, format='mixed', dayfirst=True, errors='coerce'))
+        t_fast = best_of(lambda: parse_dates(values))
+        print(f"{len(values):>10} {values.nunique():>8} {t_mixed:>10.4f} {t_fast:>10.4f} "
+              f"{t_mixed / t_fast:>7.1f}x {str(same):>5}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: session memory
+Bytes per trained session with and without compact frames
+
+Usage: python backend/benchmarks/bench_session_memory.py [path/to/data.csv]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from ingest import parse_csv
+from training import run_training
+from session_store import DiskSessionStore
+from compact_frames import compact_session, expand_session, frame_bytes
+
+DEFAULT_CSV = os.path.join(BACKEND_DIR, '..', 'data', 'catatan_umkm.csv')
+BUDGET_MB = 256
+
+def disk_bytes(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CSV
+    with open(path, 'rb') as f:
+        df_raw = parse_csv(f.read())
+    
+    print("Training one session...")
+    session_updates, _ = run_training(df_raw)
+    session = {'df_raw': df_raw, **session_updates}
+    
+    compact = compact_session(session)
+    print(f"\n{'frame':>14} {'rows':>7} {'plain (KB)':>11} {'compact (KB)':>13}")
+    for key, value in session.items():
+        if isinstance(value, pd.DataFrame):
+            plain = value.memory_usage(deep=True).sum() / 1024
+            small = compact[key].memory_usage(deep=True).sum() / 1024
+            print(f"{key:>14} {len(value):>7} {plain:>11.1f} {small:>13.1f}")
+    
+    # Predictions must not change: the trees compare float32 values
+    feature_cols = session['feature_cols']
+    restored = expand_session(compact)
+    same = np.array_equal(
+        session['best_model'].predict(session['features'][feature_cols]),
+        session['best_model'].predict(restored['features'][feature_cols])
+    )
+    
+    start = time.perf_counter()
+    for _ in range(20):
+        expand_session(compact)
+    expand_ms = (time.perf_counter() - start) / 20 * 1000
+    
+    print(f"\n{'mode':>8} {'frames (MB)':>12} {'session (MB)':>13} {'disk (MB)':>10} {'per ' + str(BUDGET_MB) + ' MB':>11}")
+    for mode in [False, True]:
+        with tempfile.TemporaryDirectory() as root:
+            store = DiskSessionStore(root, memory_budget=BUDGET_MB * 1024 * 1024, compact=mode)
+            store['session_bench'] = session
+            stats = store.stats()
+            frames = frame_bytes(compact if mode else session) / 1024 ** 2
+            per_session = stats['bytes_per_session'] / 1024 ** 2
+            print(f"{'compact' if mode else 'plain':>8} {frames:>12.2f} {per_session:>13.2f} "
+                  f"{disk_bytes(root) / 1024 ** 2:>10.2f} {int(BUDGET_MB // per_session):>11}")
+    
+    print(f"\nSame predictions after round trip: {same}; expand per read: {expand_ms:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark: cold start
+Import time and peak RSS of a fresh API process, with and without the ML stack
+
+Usage: python backend/benchmarks/bench_startup.py [repeats]
+"""
+
+import os
+import sys
+import json
+import tempfile
+import subprocess
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each case runs in a fresh interpreter; ``main`` is imported as the
+# Procfile's `python backend/main.py` would load it
+CASES = [
+    ('import main', "import main"),
+    ('+ warm_up (ML modules)', "import main; main.warm_up(workers=False)"),
+    ('+ plotting (old eager set)',
+     "import main; main.warm_up(workers=False); import matplotlib; matplotlib.use('Agg'); "
+     "import matplotlib.pyplot, seaborn"),
+]
+
+CHILD = """
+import json, resource, sys, time
+sys.path.insert(0, {backend!r})
+start = time.perf_counter()
+{code}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+def measure(code, session_dir):
+    """Seconds and peak RSS (MB) of one fresh process running ``code``"""
+    env = {**os.environ, 'UMKM_SESSION_DIR': session_dir}
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD.format(backend=BACKEND_DIR, code=code)],
+        capture_output=True, text=True, check=True, env=env, cwd=BACKEND_DIR
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    with tempfile.TemporaryDirectory() as session_dir:
+        print(f"{'case':>28} {'import (s)':>11} {'peak RSS (MB)':>14}")
+        for label, code in CASES:
+            try:
+                runs = [measure(code, session_dir) for _ in range(repeats)]
+            except subprocess.CalledProcessError as e:
+                print(f"{label:>28} failed: {e.stderr.strip().splitlines()[-1]}")
+                continue
+            seconds = np.median([run['seconds'] for run in runs])
+            rss = np.median([run['rss_mb'] for run in runs])
+            print(f"{label:>28} {seconds:>11.2f} {rss:>14.0f}")
+
+if __name__ == "__main__":
+    main()
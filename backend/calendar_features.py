@@ -0,0 +1,129 @@
+"""
+UMKM Forecasting Calendar Features
+One cached date-indexed table of calendar and holiday features, shared by
+the API pipeline and the offline script
+"""
+
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Year range the table covers unless the data reaches further,
+# e.g. UMKM_CALENDAR_YEARS=2020-2030
+CALENDAR_START_YEAR, CALENDAR_END_YEAR = (
+    int(year) for year in os.environ.get('UMKM_CALENDAR_YEARS', '2020-2030').split('-')
+)
+
+# Indonesian Ramadan periods and Eid dates (government dates up to 2026;
+# later years are astronomical estimates until they are announced)
+RAMADAN_PERIODS = [
+    ('2021-04-13', '2021-05-12'), ('2022-04-03', '2022-05-01'),
+    ('2023-03-23', '2023-04-21'), ('2024-03-12', '2024-04-09'),
+    ('2025-03-01', '2025-03-30'), ('2026-02-19', '2026-03-19'),
+    ('2027-02-08', '2027-03-09'), ('2028-01-28', '2028-02-25')
+]
+EID_FITR_DATES = [
+    '2021-05-13', '2022-05-02', '2023-04-22', '2024-04-10', '2025-03-31',
+    '2026-03-20', '2027-03-10', '2028-02-26'
+]
+EID_ADHA_DATES = [
+    '2021-07-11', '2022-07-10', '2023-06-29', '2024-06-08', '2025-06-06',
+    '2026-05-27', '2027-05-17', '2028-05-05'
+]
+
+# Fixed-date national holidays as (month, day): New Year, Independence Day, Christmas
+NATIONAL_HOLIDAYS = [(1, 1), (8, 17), (12, 25)]
+
+# Days before/after Eid when shops typically close
+CLOSURE_DAYS_BEFORE = range(5, 8)
+CLOSURE_DAYS_AFTER = range(1, 8)
+
+# Cap for days_to_eid when no Eid is ahead
+DAYS_TO_EID_MAX = 365
+
+def eid_dates():
+    """All Eid dates (al-Fitr and al-Adha), sorted"""
+    return pd.DatetimeIndex(sorted(EID_FITR_DATES + EID_ADHA_DATES))
+
+@lru_cache(maxsize=8)
+def calendar_table(start_year=CALENDAR_START_YEAR, end_year=CALENDAR_END_YEAR):
+    """Calendar features for every day of ``start_year``..``end_year``.
+    
+    Indexed by date; computed once per year range and process. Do not
+    modify the returned frame.
+    """
+    index = pd.date_range(f'{start_year}-01-01', f'{end_year}-12-31', freq='D', name='date')
+    dates = pd.Series(index, index=index)
+    table = pd.DataFrame(index=index)
+    
+    table['year'] = dates.dt.year
+    table['month'] = dates.dt.month
+    table['day'] = dates.dt.day
+    table['dayofweek'] = dates.dt.dayofweek
+    table['dayofyear'] = dates.dt.dayofyear
+    table['weekofyear'] = dates.dt.isocalendar().week
+    table['quarter'] = dates.dt.quarter
+    table['is_weekend'] = (table['dayofweek'] >= 5).astype(int)
+    table['is_month_start'] = dates.dt.is_month_start.astype(int)
+    table['is_month_end'] = dates.dt.is_month_end.astype(int)
+    
+    # Ramadan periods
+    is_ramadan = np.zeros(len(table), dtype=bool)
+    for start, end in RAMADAN_PERIODS:
+        is_ramadan |= (table.index >= start) & (table.index <= end)
+    table['is_ramadan'] = is_ramadan.astype(int)
+    
+    # Eid holidays
+    table['is_eid_fitr'] = table.index.isin(pd.DatetimeIndex(EID_FITR_DATES)).astype(int)
+    table['is_eid_adha'] = table.index.isin(pd.DatetimeIndex(EID_ADHA_DATES)).astype(int)
+    table['is_eid'] = table['is_eid_fitr'] | table['is_eid_adha']
+    
+    # Days to the next Eid (today counts as 0)
+    eids = eid_dates()
+    next_eid = np.searchsorted(eids.values, table.index.values, side='left')
+    days_to_eid = np.full(len(table), DAYS_TO_EID_MAX)
+    ahead = next_eid < len(eids)
+    days_to_eid[ahead] = (eids.values[next_eid[ahead]] - table.index.values[ahead]) // np.timedelta64(1, 'D')
+    table['days_to_eid'] = np.minimum(days_to_eid, DAYS_TO_EID_MAX)
+    table['near_eid'] = (table['days_to_eid'] <= 7).astype(int)
+    
+    # Eid closures: a few days before and the week after
+    closures = [eid - pd.Timedelta(days=i) for eid in eids for i in CLOSURE_DAYS_BEFORE]
+    closures += [eid + pd.Timedelta(days=i) for eid in eids for i in CLOSURE_DAYS_AFTER]
+    table['is_eid_closure'] = table.index.isin(pd.DatetimeIndex(closures)).astype(int)
+    
+    # National holidays
+    is_holiday = np.zeros(len(table), dtype=bool)
+    for month, day in NATIONAL_HOLIDAYS:
+        is_holiday |= (table['month'] == month).to_numpy() & (table['day'] == day).to_numpy()
+    table['is_holiday'] = is_holiday.astype(int)
+    
+    # Cyclical encoding
+    table['month_sin'] = np.sin(2 * np.pi * table['month'] / 12)
+    table['month_cos'] = np.cos(2 * np.pi * table['month'] / 12)
+    table['dow_sin'] = np.sin(2 * np.pi * table['dayofweek'] / 7)
+    table['dow_cos'] = np.cos(2 * np.pi * table['dayofweek'] / 7)
+    
+    return table
+
+def calendar_for(dates):
+    """Calendar table rows for ``dates`` (a datetime Series), aligned to it"""
+    years = dates.dt.year
+    start_year = CALENDAR_START_YEAR if years.isna().all() else min(CALENDAR_START_YEAR, int(years.min()))
+    end_year = CALENDAR_END_YEAR if years.isna().all() else max(CALENDAR_END_YEAR, int(years.max()))
+    table = calendar_table(start_year, end_year)
+    return table.reindex(dates.to_numpy()).set_axis(dates.index)
+
+def add_calendar_features(df, columns=None):
+    """Join calendar features onto ``df`` by its ``date`` column.
+    
+    ``columns`` limits which table columns are added (default: all).
+    Returns a new frame.
+    """
+    features = calendar_for(df['date'])
+    if columns is not None:
+        features = features[list(columns)]
+    df = df.drop(columns=[col for col in features.columns if col in df.columns])
+    return pd.concat([df, features], axis=1)
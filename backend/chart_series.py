@@ -0,0 +1,87 @@
+"""
+UMKM Forecasting Chart Series
+Date filtering, LTTB downsampling and Arrow encoding for time-series responses
+"""
+
+import numpy as np
+
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: indices of ``n_out`` points to keep.
+    
+    ``x`` is increasing, ``y`` has one column per series sharing that
+    axis (the triangle areas of all series are summed, so one set of
+    points serves every series). The first and last points are always
+    kept. Returns all indices if ``n_out`` is not below the number of
+    points.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64).reshape(len(x), -1)
+    n = len(x)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    n_out = max(n_out, 3)
+    
+    # Buckets between the fixed first and last points
+    every = (n - 2) / (n_out - 2)
+    edges = (np.floor(np.arange(n_out - 1) * every) + 1).astype(np.intp)
+    edges[-1] = n - 1
+    sizes = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / sizes
+    mean_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1, axis=0) / sizes[:, None]
+    # Each bucket is compared with the next bucket's mean (the last with the last point)
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.vstack([mean_y[1:], y[-1:]])
+    
+    keep = np.empty(n_out, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[a] - next_x[i]) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop, None]) * (next_y[i] - y[a])
+        ).sum(axis=1)
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+def select_series(dates, columns, start=None, end=None, points=None):
+    """Filter a date-sorted series to ``[start, end]`` and downsample to ``points``.
+    
+    ``dates`` is a datetime64 array, ``columns`` maps names to value
+    arrays of the same length. Returns ``(dates, columns, total)``
+    where ``total`` is the number of points in the date range.
+    """
+    mask = np.ones(len(dates), dtype=bool)
+    if start is not None:
+        mask &= dates >= np.datetime64(start)
+    if end is not None:
+        mask &= dates <= np.datetime64(end)
+    dates = dates[mask]
+    columns = {name: np.asarray(values)[mask] for name, values in columns.items()}
+    total = len(dates)
+    
+    if points is not None and points < total:
+        days = dates.astype('datetime64[D]').astype(np.int64)
+        keep = lttb_indices(days, np.column_stack(list(columns.values())), points)
+        dates = dates[keep]
+        columns = {name: values[keep] for name, values in columns.items()}
+    return dates, columns, total
+
+def to_arrow_stream(dates, columns):
+    """Arrow IPC stream bytes with a ``date`` (date32) column plus ``columns``"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ValueError("Arrow responses require the pyarrow package")
+    
+    table = pa.table({
+        'date': pa.array(dates.astype('datetime64[D]'), type=pa.date32()),
+        **{name: pa.array(values) for name, values in columns.items()}
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
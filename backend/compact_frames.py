@@ -0,0 +1,126 @@
+"""
+UMKM Forecasting Compact Frames
+Lossless-for-serving narrow dtypes for DataFrames kept in sessions
+"""
+
+import numpy as np
+import pandas as pd
+
+from ingest import DAILY_COLUMNS
+from features import FEATURE_COLS
+
+# Derived model inputs in the feature frame; the trees split on float32
+# values anyway, so storing them as float32 does not change any
+# prediction. Other frames (e.g. the EWM state) keep full precision.
+FLOAT32_COLUMNS = set(FEATURE_COLS) - set(DAILY_COLUMNS)
+FLOAT32_FRAMES = {'features'}
+
+# Session key holding the original dtypes of compacted frames
+COMPACT_DTYPES_KEY = '_compact_dtypes'
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+NS_PER_DAY = 86_400_000_000_000
+
+def _narrow_int_dtype(values):
+    """Smallest signed numpy integer dtype holding ``values``"""
+    low, high = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return np.int64
+
+def compact_frame(df, float32_columns=()):
+    """Return ``(compact_df, dtypes)``.
+    
+    - text columns with repeated values become categoricals
+    - integer columns (and nullable ones without missing values) get the
+      narrowest integer dtype that holds them
+    - float columns in ``float32_columns`` become float32
+    - datetime columns holding whole days become int32 day numbers
+    
+    ``dtypes`` maps the date and text columns to their original dtype,
+    for ``expand_frame``. Only the float32 columns lose precision.
+    """
+    columns, dtypes = {}, {}
+    for name, col in df.items():
+        dtype = col.dtype
+        converted = None
+        if pd.api.types.is_datetime64_dtype(dtype) and not col.isna().any():
+            days = col.to_numpy().astype('datetime64[D]')
+            if (days == col.to_numpy()).all():
+                converted = (days - EPOCH).astype(np.int32)
+        elif pd.api.types.is_bool_dtype(dtype):
+            pass
+        elif pd.api.types.is_integer_dtype(dtype) and not col.isna().any():
+            values = col.to_numpy(dtype=np.int64)
+            narrow = _narrow_int_dtype(values)
+            if narrow != dtype:
+                converted = values.astype(narrow)
+        elif pd.api.types.is_float_dtype(dtype) and name in float32_columns and dtype != np.float32:
+            converted = col.to_numpy(dtype=np.float32)
+        elif (pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)) \
+                and not isinstance(dtype, pd.CategoricalDtype) and col.nunique() <= len(col) // 2:
+            converted = col.astype('category')
+        
+        if converted is None:
+            columns[name] = col
+        else:
+            columns[name] = pd.Series(converted, index=df.index, name=name)
+            if not pd.api.types.is_numeric_dtype(dtype):
+                dtypes[name] = str(dtype)
+    return pd.DataFrame(columns, index=df.index), dtypes
+
+def expand_frame(df, dtypes):
+    """Restore the date and text columns compacted by ``compact_frame``.
+    
+    Numeric columns keep their narrow dtypes: the pipeline and the
+    models take them as they are, and restoring them would cost more
+    than a typical request.
+    """
+    if not dtypes:
+        return df
+    df = df.copy(deep=False)
+    for name, dtype in dtypes.items():
+        col = df[name]
+        if dtype.startswith('datetime64'):
+            nanoseconds = col.to_numpy().astype(np.int64) * NS_PER_DAY
+            df[name] = nanoseconds.view('datetime64[ns]')
+        elif dtype == 'object':
+            df[name] = np.asarray(col.cat.categories, dtype=object)[col.cat.codes.to_numpy()]
+        else:
+            df[name] = col.astype(dtype)
+    return df
+
+def compact_session(session):
+    """Copy of ``session`` with every DataFrame compacted"""
+    if COMPACT_DTYPES_KEY in session:
+        return session
+    compact, all_dtypes = {}, {}
+    for key, value in session.items():
+        if isinstance(value, pd.DataFrame):
+            value, dtypes = compact_frame(value, FLOAT32_COLUMNS if key in FLOAT32_FRAMES else ())
+            if dtypes:
+                all_dtypes[key] = dtypes
+        compact[key] = value
+    compact[COMPACT_DTYPES_KEY] = all_dtypes
+    return compact
+
+def expand_session(session):
+    """Copy of a compacted session with dates and text restored"""
+    if COMPACT_DTYPES_KEY not in session:
+        return session
+    all_dtypes = session[COMPACT_DTYPES_KEY]
+    return {
+        key: expand_frame(value, all_dtypes.get(key)) if isinstance(value, pd.DataFrame) else value
+        for key, value in session.items()
+        if key != COMPACT_DTYPES_KEY
+    }
+
+def frame_bytes(session):
+    """Deep memory of all DataFrames in a session"""
+    return sum(
+        int(value.memory_usage(deep=True).sum())
+        for value in session.values()
+        if isinstance(value, pd.DataFrame)
+    )
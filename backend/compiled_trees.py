@@ -0,0 +1,100 @@
+"""
+UMKM Forecasting Compiled Tree Inference
+Flat-array exports of the fitted tree models for low-latency predictions
+"""
+
+import os
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from xgboost import XGBRegressor
+
+COMPILED_INFERENCE = os.environ.get('UMKM_COMPILED_INFERENCE', '1') != '0'
+PREDICT_CHUNK_ROWS = 4096
+
+class CompiledForest:
+    """Tree ensemble packed into flat node arrays.
+    
+    All trees share one set of arrays (``feature``, ``threshold``,
+    ``left``, ``right``, ``value``); ``roots`` holds each tree's first
+    node. Leaves point to themselves, so every row walks every tree for
+    exactly ``depth`` vectorized steps with no per-node branching.
+    Predictions are ``offset + scale * sum(leaf values)``: the mean of
+    the trees for a random forest, the shrunk sum plus the initial
+    estimate for gradient boosting.
+    """
+    
+    def __init__(self, trees, scale, offset):
+        sizes = [tree.node_count for tree in trees]
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        
+        feature, threshold, left, right, value = [], [], [], [], []
+        for tree, start in zip(trees, starts):
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left < 0
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            left.append(np.where(is_leaf, nodes, tree.children_left) + start)
+            right.append(np.where(is_leaf, nodes, tree.children_right) + start)
+            value.append(tree.value[:, 0, 0])
+        
+        self.roots = starts.astype(np.intp)
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.threshold = np.concatenate(threshold)
+        self.left = np.concatenate(left).astype(np.intp)
+        self.right = np.concatenate(right).astype(np.intp)
+        self.value = np.concatenate(value)
+        self.depth = max(tree.max_depth for tree in trees)
+        self.scale = scale
+        self.offset = offset
+    
+    def predict(self, X):
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if len(X) > PREDICT_CHUNK_ROWS:
+            return np.concatenate([
+                self.predict(X[start:start + PREDICT_CHUNK_ROWS])
+                for start in range(0, len(X), PREDICT_CHUNK_ROWS)
+            ])
+        rows = np.arange(len(X))[:, None]
+        node = np.repeat(self.roots[None, :], len(X), axis=0)
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.offset + self.scale * self.value[node].sum(axis=1)
+
+class CompiledBooster:
+    """XGBoost booster called through ``inplace_predict`` on bare arrays"""
+    
+    def __init__(self, model):
+        self.booster = model.get_booster()
+        try:
+            self.iteration_range = (0, model.best_iteration + 1)
+        except AttributeError:
+            self.iteration_range = (0, 0)
+    
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        return self.booster.inplace_predict(X, iteration_range=self.iteration_range)
+
+def compile_model(model):
+    """Export a fitted model for fast inference, or None if unsupported"""
+    if isinstance(model, XGBRegressor):
+        return CompiledBooster(model)
+    if isinstance(model, RandomForestRegressor):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        return CompiledForest(trees, scale=1 / len(trees), offset=0.0)
+    if isinstance(model, GradientBoostingRegressor) and model.loss == 'squared_error':
+        trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+        if model.init_ == 'zero':
+            init = 0.0
+        else:
+            init = float(np.ravel(model.init_.predict(np.zeros((1, model.n_features_in_))))[0])
+        return CompiledForest(trees, scale=model.learning_rate, offset=init)
+    return None
+
+def session_predictor(session):
+    """The session's compiled best model if available, else the model itself"""
+    if COMPILED_INFERENCE and session.get('compiled_model') is not None:
+        return session['compiled_model']
+    return session['best_model']
@@ -0,0 +1,59 @@
+"""
+UMKM Forecasting Date Parsing
+Fast date parsing for upload files with a few repeated date formats
+"""
+
+import pandas as pd
+import numpy as np
+
+# Explicit formats tried before falling back to the mixed parser, in
+# day-first and month-first flavours
+DAYFIRST_FORMATS = ['%A, %B %d, %Y', '%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%B %d, %Y', '%d %B %Y']
+MONTHFIRST_FORMATS = ['%A, %B %d, %Y', '%m/%d/%Y', '%Y-%m-%d', '%m-%d-%Y', '%B %d, %Y', '%d %B %Y']
+
+def detect_formats(values, dayfirst=True, sample_size=200):
+    """Return the explicit formats that match a sample of ``values``, most common first"""
+    candidates = DAYFIRST_FORMATS if dayfirst else MONTHFIRST_FORMATS
+    sample = pd.Series(values[:sample_size], dtype=object)
+    
+    hits = {}
+    for fmt in candidates:
+        count = pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum()
+        if count:
+            hits[fmt] = count
+    return sorted(hits, key=hits.get, reverse=True)
+
+def parse_dates(values, dayfirst=True):
+    """Parse date strings, equivalent to ``pd.to_datetime(format='mixed', errors='coerce')``.
+    
+    Only the unique strings are parsed. They go through the detected
+    explicit formats in turn (dominant first); whatever none of them
+    matches is handed to the mixed parser. The parsed uniques are then
+    mapped back onto the rows. Returns a datetime Series aligned with
+    ``values``.
+    
+    ISO strings (``2021-01-02``) are read year-month-day; the mixed parser
+    with ``dayfirst=True`` reads them year-day-month.
+    """
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values)
+    uniques = np.asarray(uniques, dtype=object)
+    
+    parsed = pd.Series(pd.NaT, index=range(len(uniques)), dtype='datetime64[ns]')
+    remaining = np.arange(len(uniques))
+    for fmt in detect_formats(uniques, dayfirst=dayfirst):
+        if not len(remaining):
+            break
+        attempt = pd.to_datetime(pd.Series(uniques[remaining], dtype=object), format=fmt, errors='coerce')
+        matched = attempt.notna().to_numpy()
+        parsed.iloc[remaining[matched]] = attempt[matched].to_numpy()
+        remaining = remaining[~matched]
+    
+    if len(remaining):
+        parsed.iloc[remaining] = pd.to_datetime(
+            pd.Series(uniques[remaining], dtype=object), format='mixed', dayfirst=dayfirst, errors='coerce'
+        ).to_numpy()
+    
+    result = parsed.to_numpy()[codes]
+    result[codes == -1] = np.datetime64('NaT')
+    return pd.Series(result, index=values.index, name=values.name)
@@ -0,0 +1,151 @@
+"""
+UMKM Forecasting Feature Engine
+Causal lag, rolling and EWM features computed in one grouped pass
+"""
+
+import pandas as pd
+import numpy as np
+
+LAGS = [1, 2, 3, 7, 14, 21, 28]
+WINDOWS = [7, 14, 28]
+EMA_SPANS = [7, 14]
+TREND_PERIOD = 7
+
+# Model input columns: calendar features joined onto each row (see
+# calendar_features.py), product encoding, prices and the lag features
+FEATURE_COLS = [
+    'year', 'month', 'dayofweek', 'weekofyear', 'quarter', 'dayofyear',
+    'is_weekend', 'is_month_start', 'is_month_end',
+    'is_ramadan', 'is_eid', 'near_eid', 'is_holiday', 'days_to_eid',
+    'product_encoded', 'price', 'unit_cost',
+    'month_sin', 'month_cos', 'dow_sin', 'dow_cos',
+    'sold_lag1', 'sold_lag2', 'sold_lag3', 'sold_lag7', 'sold_lag14', 'sold_lag21', 'sold_lag28',
+    'sold_ma7', 'sold_ma14', 'sold_ma28',
+    'sold_std7', 'sold_std14', 'sold_std28',
+    'sold_max7', 'sold_max14', 'sold_max28',
+    'sold_min7', 'sold_min14', 'sold_min28',
+    'sold_ema7', 'sold_ema14', 'sold_trend'
+]
+
+def add_lag_features(panel, target='sold', group_col='product_name'):
+    """Add causal lag features for every product in one grouped pass.
+    
+    ``panel`` must have a unique index and be sorted by date within each
+    product. Every feature at a row only looks at earlier rows of the same
+    product, so computing it over the full history gives the same value as
+    computing it over any prefix that contains the row.
+    """
+    panel = panel.copy()
+    keys = panel[group_col]
+    grouped = panel[target].groupby(keys, sort=False)
+    
+    for lag in LAGS:
+        panel[f'{target}_lag{lag}'] = grouped.shift(lag)
+    
+    shifted = grouped.shift(1).groupby(keys, sort=False)
+    for window in WINDOWS:
+        rolling = shifted.rolling(window, min_periods=1)
+        panel[f'{target}_ma{window}'] = rolling.mean().droplevel(0)
+        panel[f'{target}_std{window}'] = rolling.std().droplevel(0)
+        panel[f'{target}_max{window}'] = rolling.max().droplevel(0)
+        panel[f'{target}_min{window}'] = rolling.min().droplevel(0)
+    
+    for span in EMA_SPANS:
+        panel[f'{target}_ema{span}'] = shifted.ewm(span=span, adjust=False).mean().droplevel(0)
+    panel[f'{target}_trend'] = grouped.diff(TREND_PERIOD)
+    
+    return panel
+
+def fit_product_medians(train, feature_cols, group_col='product_name'):
+    """Per-product and global training medians used for imputation.
+    
+    Returns ``(product_stats, global_stats)``: a products x columns median
+    table built with one grouped reduction, and the global median series.
+    """
+    cols = [col for col in feature_cols if col in train.columns]
+    product_stats = train.groupby(group_col, sort=False)[cols].median()
+    global_stats = train[cols].median()
+    return product_stats, global_stats
+
+def impute_product_medians(df, product_stats, global_stats, group_col='product_name'):
+    """Fill missing feature values with the row's product training median.
+    
+    Rows of products that are not in ``product_stats`` fall back to the
+    global medians. Each column with gaps is filled by one vectorized
+    lookup into the median table, so no rows x columns fill frame is
+    built.
+    """
+    df = df.copy()
+    cols = [col for col in product_stats.columns if col in df.columns]
+    
+    codes = product_stats.index.get_indexer(df[group_col])
+    known = codes >= 0
+    stats = product_stats[cols].to_numpy(dtype=float)
+    fallback = global_stats[cols].to_numpy(dtype=float)
+    for j, col in enumerate(cols):
+        values = df[col].to_numpy(dtype=float, copy=True)
+        missing = np.isnan(values)
+        if not missing.any():
+            continue
+        values[missing] = np.where(known[missing], stats[codes[missing], j], fallback[j])
+        df[col] = values
+    return df
+
+def build_tail_state(panel, target='sold', group_col='product_name'):
+    """Per-product state needed to featurize rows that come after ``panel``.
+
+    Returns ``(tail_history, tail_ema)``: the last ``max(LAGS + WINDOWS)``
+    rows of (product, date, target) per product, and the EWM value of
+    each span after consuming the product's last observation. ``panel``
+    must already carry the EWM features from ``add_lag_features``.
+    """
+    panel = panel.sort_values([group_col, 'date'], kind='stable')
+    context = max(LAGS + WINDOWS)
+    tail_history = panel.groupby(group_col, sort=False).tail(context)[[group_col, 'date', target]]
+    last = panel.groupby(group_col, sort=False).tail(1).set_index(group_col)
+    return tail_history.reset_index(drop=True), _advance_ema(last, target)
+
+def _advance_ema(last, target):
+    """EWM state after consuming each row of ``last`` (one row per product)"""
+    state = {}
+    for span in EMA_SPANS:
+        alpha = 2 / (span + 1)
+        previous = last[f'{target}_ema{span}']
+        state[f'{target}_ema{span}'] = ((1 - alpha) * previous + alpha * last[target]).fillna(last[target])
+    return pd.DataFrame(state, index=last.index)
+
+def extend_lag_features(tail_history, tail_ema, new_rows, target='sold', group_col='product_name'):
+    """Featurize rows that follow the history summarized by the tail state.
+
+    Lags and rolling windows are computed over the cached tail plus the
+    new rows only; the EWMs continue from the cached state. The values
+    match featurizing the full history as long as every new row is dated
+    after its product's last cached row. Returns
+    ``(featurized_rows, tail_history, tail_ema)`` with the state advanced
+    past the new rows.
+    """
+    context = pd.concat(
+        [tail_history.assign(_new=False), new_rows.assign(_new=True)],
+        ignore_index=True
+    )
+    context = context.sort_values([group_col, 'date'], kind='stable').reset_index(drop=True)
+    context = add_lag_features(context, target=target, group_col=group_col)
+    
+    rows = context[context['_new']].drop(columns=['_new'])
+    keys = rows[group_col]
+    # EWM input for each new row: the cached state for the first new row
+    # of a product, then the previous new row's target
+    previous = rows[target].groupby(keys, sort=False).shift(1)
+    for span in EMA_SPANS:
+        col = f'{target}_ema{span}'
+        seeded = previous.fillna(keys.map(tail_ema[col]))
+        rows[col] = seeded.groupby(keys, sort=False).ewm(span=span, adjust=False).mean().droplevel(0)
+    
+    history = pd.concat([tail_history, rows[[group_col, 'date', target]]], ignore_index=True)
+    history = history.groupby(group_col, sort=False).tail(max(LAGS + WINDOWS)).reset_index(drop=True)
+    
+    last = rows.groupby(group_col, sort=False).tail(1).set_index(group_col)
+    ema = _advance_ema(last, target)
+    ema = pd.concat([tail_ema.drop(ema.index, errors='ignore'), ema])
+    
+    return rows, history, ema
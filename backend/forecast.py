@@ -0,0 +1,99 @@
+"""
+UMKM Forecasting Future Forecasts
+Recursive multi-step forecasts rolled forward from the cached lag state
+"""
+
+import numpy as np
+import pandas as pd
+
+from features import LAGS, WINDOWS, EMA_SPANS
+from training import CALENDAR_COLS
+from calendar_features import add_calendar_features
+from compiled_trees import session_predictor
+
+def latest_prices(df_raw, products):
+    """Most recent price and unit cost per product, as (P, 2) array"""
+    last = df_raw.sort_values('date').groupby('product_name')[['price', 'unit_cost']].last()
+    return last.reindex(products).to_numpy(dtype=float)
+
+def forecast_session(session, horizon, products=None):
+    """Forecast daily sales for the next ``horizon`` days.
+    
+    Starts from the session's cached tail state (last 28 days of ``sold``
+    and the EWM values per product) and rolls the best model forward one
+    day at a time. Each step fills one (products x features) matrix in
+    place, predicts all products in a single call, then shifts the
+    prediction into the sold buffer and the EWM state. ``sold_trend``
+    needs the day's own sales, so like any unknown feature it is filled
+    with the product's training median.
+    
+    Returns ``(dates, products, predictions)`` with ``predictions`` of
+    shape (len(products), horizon).
+    """
+    feature_cols = session['feature_cols']
+    tail_history = session['tail_history']
+    le_product = session['le_product']
+    
+    if products is None:
+        products = tail_history['product_name'].unique().tolist()
+    products = list(products)
+    n_products = len(products)
+    context = max(LAGS + WINDOWS)
+    
+    # Sold buffer: `context` days of history right-aligned, then the horizon
+    sold = np.full((n_products, context + horizon), np.nan)
+    rows = tail_history[tail_history['product_name'].isin(products)]
+    order = rows.groupby('product_name', sort=False).cumcount(ascending=False).to_numpy()
+    index = pd.Index(products).get_indexer(rows['product_name'])
+    sold[index, context - 1 - order] = rows['sold'].to_numpy(dtype=float)
+    
+    ema_state = session['tail_ema'].reindex(products)
+    ema = {span: ema_state[f'sold_ema{span}'].to_numpy(dtype=float).copy() for span in EMA_SPANS}
+    
+    start = session['df_raw']['date'].max() + pd.Timedelta(days=1)
+    dates = pd.date_range(start, periods=horizon, freq='D')
+    calendar = add_calendar_features(pd.DataFrame({'date': dates}), CALENDAR_COLS)
+    
+    col = {name: j for j, name in enumerate(feature_cols)}
+    X = np.empty((n_products, len(feature_cols)))
+    X[:, col['product_encoded']] = le_product.transform(products)
+    X[:, [col['price'], col['unit_cost']]] = latest_prices(session['df_raw'], products)
+    calendar_cols = [name for name in feature_cols if name in calendar.columns]
+    calendar_values = calendar[calendar_cols].to_numpy(dtype=float)
+    calendar_index = [col[name] for name in calendar_cols]
+    
+    # Missing features get the product's training median (global median
+    # where the product has none), like impute_product_medians
+    fill = session['product_stats'].reindex(products)[feature_cols].to_numpy(dtype=float)
+    global_fill = session['global_stats'].reindex(feature_cols).to_numpy(dtype=float)
+    fill = np.where(np.isnan(fill), global_fill, fill)
+    
+    predictor = session_predictor(session)
+    predictions = np.empty((n_products, horizon))
+    for step in range(horizon):
+        pos = context + step
+        X[:, calendar_index] = calendar_values[step]
+        
+        for lag in LAGS:
+            X[:, col[f'sold_lag{lag}']] = sold[:, pos - lag]
+        for window in WINDOWS:
+            recent = sold[:, pos - window:pos]
+            X[:, col[f'sold_ma{window}']] = np.nanmean(recent, axis=1)
+            X[:, col[f'sold_std{window}']] = np.nanstd(recent, axis=1, ddof=1)
+            X[:, col[f'sold_max{window}']] = np.nanmax(recent, axis=1)
+            X[:, col[f'sold_min{window}']] = np.nanmin(recent, axis=1)
+        for span in EMA_SPANS:
+            X[:, col[f'sold_ema{span}']] = ema[span]
+        X[:, col['sold_trend']] = np.nan
+        
+        missing = np.isnan(X)
+        X[missing] = fill[missing]
+        
+        pred = np.maximum(predictor.predict(X), 0)
+        predictions[:, step] = pred
+        sold[:, pos] = pred
+        for span in EMA_SPANS:
+            alpha = 2 / (span + 1)
+            ema[span] = np.where(np.isnan(ema[span]), pred, (1 - alpha) * ema[span] + alpha * pred)
+    
+    return dates, products, predictions
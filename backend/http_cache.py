@@ -0,0 +1,64 @@
+"""
+UMKM Forecasting HTTP Caching
+ETags and an in-process cache of rendered responses for session read endpoints
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Clients may store responses but must revalidate them (cheap: 304)
+CACHE_CONTROL = 'private, no-cache'
+
+def make_etag(version, endpoint, params):
+    """Strong ETag for ``endpoint`` with ``params`` on a session at ``version``"""
+    payload = json.dumps([endpoint, params], sort_keys=True, default=str)
+    return f'"{version}-{hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]}"'
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value matches ``etag``"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+class ResponseCache:
+    """LRU of rendered responses: ``key -> (body, status_code, headers)``.
+    
+    Keys include the session's training version, so entries of older
+    versions are never served again and age out of the LRU.
+    """
+    
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+    
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+def create_response_cache():
+    """Response cache sized by UMKM_RESPONSE_CACHE_ENTRIES (default 512, 0 disables)"""
+    return ResponseCache(int(os.environ.get('UMKM_RESPONSE_CACHE_ENTRIES', 512)))
@@ -0,0 +1,210 @@
+"""
+UMKM Forecasting Upload Ingestion
+Parse uploaded sales files into the aggregated daily frame
+"""
+
+import io
+import os
+import codecs
+import hashlib
+
+import pandas as pd
+
+from date_parsing import parse_dates
+
+KEY_COLUMNS = ['date', 'product_name']
+SUM_COLUMNS = ['produced', 'sold', 'revenue', 'expense']
+MEAN_COLUMNS = ['price', 'unit_cost']
+# Column order of the aggregated daily frame
+DAILY_COLUMNS = ['date', 'product_name', 'produced', 'sold', 'price', 'unit_cost', 'revenue', 'expense']
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Columnar upload formats, detected by magic bytes first and extension second
+COLUMNAR_EXTENSIONS = {
+    '.parquet': 'parquet', '.pq': 'parquet',
+    '.feather': 'feather', '.arrow': 'feather', '.ipc': 'feather',
+    '.arrows': 'arrow_stream'
+}
+
+def aggregate_daily(df_raw):
+    """Aggregate raw transactions to one row per (date, product_name)"""
+    df_raw = df_raw.dropna(subset=['date']).sort_values('date').reset_index(drop=True)
+    
+    return df_raw.groupby(KEY_COLUMNS, as_index=False).agg({
+        'produced': 'sum',
+        'sold': 'sum',
+        'price': 'mean',
+        'unit_cost': 'mean',
+        'revenue': 'sum',
+        'expense': 'sum'
+    })
+
+def parse_csv(contents):
+    """Parse raw CSV bytes into the aggregated daily frame"""
+    df_raw = pd.read_csv(io.StringIO(contents.decode('utf-8')))
+    
+    # Parse dates
+    df_raw['date'] = parse_dates(df_raw['date'], dayfirst=True)
+    
+    return aggregate_daily(df_raw)
+
+async def hash_upload(file, chunk_size=UPLOAD_CHUNK_BYTES):
+    """SHA-256 of an UploadFile's bytes, read in chunks; rewinds the file"""
+    digest = hashlib.sha256()
+    await file.seek(0)
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+    await file.seek(0)
+    return digest.hexdigest()
+
+class StreamingCsvAggregator:
+    """Fold a CSV upload into daily aggregates one chunk at a time.
+    
+    Each ``feed`` parses the complete lines of the chunk and reduces them
+    to partial (date, product_name) aggregates: sums, plus sum/count pairs
+    for the mean columns. Partials are merged into the running table once
+    they outgrow it, so memory stays proportional to the number of unique
+    day/product keys rather than the file size. Quoted fields must not
+    contain line breaks.
+    """
+    
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._header = None
+        self._pending = ''
+        self._running = None
+        self._parts = []
+        self._part_rows = 0
+        self.rows_read = 0
+    
+    def feed(self, chunk):
+        """Consume the next block of bytes"""
+        text = self._pending + self._decoder.decode(chunk)
+        if self._header is None:
+            if '\n' not in text:
+                self._pending = text
+                return
+            self._header, text = text.split('\n', 1)
+        
+        cut = text.rfind('\n')
+        if cut < 0:
+            self._pending = text
+            return
+        self._pending = text[cut + 1:]
+        self._add_lines(text[:cut + 1])
+    
+    def finish(self):
+        """Flush the trailing partial line and return the aggregated daily frame"""
+        tail = self._pending + self._decoder.decode(b'', final=True)
+        self._pending = ''
+        if self._header is None:
+            self._header, tail = tail, ''
+        if tail.strip():
+            self._add_lines(tail)
+        self._compact()
+        
+        if self._running is None:
+            raise ValueError("No data rows found")
+        
+        df = self._running.reset_index()
+        for col in MEAN_COLUMNS:
+            df[col] = df[col] / df.pop(f'{col}_count')
+        return df[DAILY_COLUMNS]
+    
+    def _add_lines(self, lines):
+        chunk = pd.read_csv(io.StringIO(self._header + '\n' + lines))
+        self.rows_read += len(chunk)
+        
+        chunk['date'] = parse_dates(chunk['date'], dayfirst=True)
+        chunk = chunk.dropna(subset=['date'])
+        for col in MEAN_COLUMNS:
+            chunk[f'{col}_count'] = chunk[col].notna().astype('int64')
+        
+        value_cols = SUM_COLUMNS + MEAN_COLUMNS + [f'{col}_count' for col in MEAN_COLUMNS]
+        part = chunk.groupby(KEY_COLUMNS)[value_cols].sum()
+        self._parts.append(part)
+        self._part_rows += len(part)
+        
+        running_rows = 0 if self._running is None else len(self._running)
+        if self._part_rows > max(running_rows, 10000):
+            self._compact()
+    
+    def _compact(self):
+        """Merge pending partial aggregates into the running table"""
+        if not self._parts:
+            return
+        parts = self._parts if self._running is None else [self._running] + self._parts
+        self._running = pd.concat(parts).groupby(level=KEY_COLUMNS).sum()
+        self._parts = []
+        self._part_rows = 0
+
+async def stream_csv_upload(file, chunk_size=UPLOAD_CHUNK_BYTES, run_sync=None):
+    """Read an UploadFile in chunks and return the aggregated daily frame.
+    
+    ``run_sync`` (e.g. starlette's ``run_in_threadpool``) runs the
+    CPU-bound parsing of each chunk off the event loop.
+    """
+    aggregator = StreamingCsvAggregator()
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        if run_sync is None:
+            aggregator.feed(chunk)
+        else:
+            await run_sync(aggregator.feed, chunk)
+    
+    return aggregator.finish() if run_sync is None else await run_sync(aggregator.finish)
+
+def detect_upload_format(filename, head):
+    """Return 'csv', 'parquet', 'feather' or 'arrow_stream' for an upload"""
+    if head.startswith(b'PAR1'):
+        return 'parquet'
+    if head.startswith(b'ARROW1') or head.startswith(b'FEA1'):
+        return 'feather'
+    extension = os.path.splitext(filename or '')[1].lower()
+    return COLUMNAR_EXTENSIONS.get(extension, 'csv')
+
+def read_columnar(contents, fmt):
+    """Parse a Parquet / Feather / Arrow upload into the aggregated daily frame.
+    
+    Only the columns the pipeline uses are read. Typed date and numeric
+    columns are used as-is; a string date column goes through
+    ``parse_dates``.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet/Arrow uploads require the pyarrow package")
+    
+    source = pa.BufferReader(pa.py_buffer(contents))
+    if fmt == 'parquet':
+        parquet_file = pq.ParquetFile(source)
+        columns = [col for col in DAILY_COLUMNS if col in parquet_file.schema_arrow.names]
+        table = parquet_file.read(columns=columns)
+    elif fmt == 'arrow_stream':
+        table = pa.ipc.open_stream(source).read_all()
+    else:
+        table = feather.read_table(source)
+    table = table.select([col for col in DAILY_COLUMNS if col in table.column_names])
+    
+    df_raw = table.to_pandas(date_as_object=False)
+    
+    # Dictionary-encoded names arrive as categoricals; group on plain labels
+    if isinstance(df_raw['product_name'].dtype, pd.CategoricalDtype):
+        df_raw['product_name'] = df_raw['product_name'].astype(object)
+    
+    if pd.api.types.is_datetime64_any_dtype(df_raw['date']):
+        if getattr(df_raw['date'].dt, 'tz', None) is not None:
+            df_raw['date'] = df_raw['date'].dt.tz_localize(None)
+        df_raw['date'] = df_raw['date'].dt.normalize()
+    else:
+        df_raw['date'] = parse_dates(df_raw['date'], dayfirst=True)
+    
+    return aggregate_daily(df_raw)
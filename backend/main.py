@@ -3,33 +3,42 @@ UMKM Time Series Forecasting API
 FastAPI Backend with Complete ML Pipeline
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
-import pandas as pd
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
 import numpy as np
-import io
-import json
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+import os
+import sys
+import time
+import importlib
+import uuid
+import hashlib
+import asyncio
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
 import warnings
 warnings.filterwarnings('ignore')
 
-# ML Models
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from xgboost import XGBRegressor
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score, mean_absolute_percentage_error
-from sklearn.preprocessing import LabelEncoder
-import joblib
-import base64
-from io import BytesIO
-
-# Plotting
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import seaborn as sns
+# Sibling modules must resolve for both `python backend/main.py`
+# and `uvicorn backend.main:app`
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Data pipeline. The ML modules (training, forecast, inference, tuning,
+# backtest) pull in scikit-learn and XGBoost, so they are imported where
+# they are used: a fresh instance can take uploads before they load
+# (see warm_up to load them ahead of the first request)
+from ingest import parse_csv, stream_csv_upload, detect_upload_format, read_columnar, hash_upload
+from explain import top_features
+from scenarios import sweep_scenarios, DEFAULT_MULTIPLIERS, DEFAULT_QUANTILES
+from session_store import create_session_store
+from chart_series import select_series, to_arrow_stream, ARROW_MEDIA_TYPE
+from http_cache import make_etag, etag_matches, create_response_cache, CACHE_CONTROL
 
 app = FastAPI(title="UMKM Forecasting API", version="1.0.0")
 
@@ -42,163 +51,248 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global storage for session data
-sessions = {}
+# Compress larger responses for clients sending Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=int(os.environ.get('UMKM_GZIP_MIN_BYTES', 1024)))
+
+# Global storage for session data (RAM + disk, see session_store.py)
+sessions = create_session_store()
+
+# Content-addressed cache: parsed uploads keyed by the SHA-256 of the file
+# bytes, and training outputs keyed by dataset digest + training config
+cache = create_session_store('cache', memory_env='UMKM_CACHE_MEMORY_MB', default_memory_mb=128)
+
+# Rendered read-endpoint responses, keyed by session training version,
+# and the known version of each session (see cached_read)
+response_cache = create_response_cache()
+session_versions = {}
+
+# Background training jobs; finished ones beyond MAX_FINISHED_JOBS are
+# dropped oldest first
+jobs = {}
+MAX_FINISHED_JOBS = 1000
+MAX_FORECAST_HORIZON = 90
+MAX_BATCH_ROWS = 100_000
+MAX_SCENARIO_PLANS = 10_000
+TRAIN_WORKERS = int(os.environ.get('UMKM_TRAIN_WORKERS', min(2, os.cpu_count() or 1)))
+_training_pool = None
+_training_pool_lock = threading.Lock()
+# Merges finished training outputs into the store, keeping that disk I/O
+# off the process pool's callback thread
+_job_finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='training-jobs')
 
 # =====================================================================
-# UTILITY FUNCTIONS
+# BACKGROUND JOBS
 # =====================================================================
 
-def add_calendar_features(df):
-    """Add comprehensive calendar and business features"""
-    df = df.copy()
-    
-    df['year'] = df['date'].dt.year
-    df['month'] = df['date'].dt.month
-    df['day'] = df['date'].dt.day
-    df['dayofweek'] = df['date'].dt.dayofweek
-    df['dayofyear'] = df['date'].dt.dayofyear
-    df['weekofyear'] = df['date'].dt.isocalendar().week
-    df['quarter'] = df['date'].dt.quarter
-    df['is_weekend'] = (df['dayofweek'] >= 5).astype(int)
-    df['is_month_start'] = df['date'].dt.is_month_start.astype(int)
-    df['is_month_end'] = df['date'].dt.is_month_end.astype(int)
-    
-    # Ramadan periods
-    ramadan_periods = [
-        ('2021-04-13', '2021-05-12'), ('2022-04-03', '2022-05-01'),
-        ('2023-03-23', '2023-04-21'), ('2024-03-12', '2024-04-09'),
-        ('2025-03-01', '2025-03-30')
-    ]
-    df['is_ramadan'] = 0
-    for start, end in ramadan_periods:
-        mask = (df['date'] >= start) & (df['date'] <= end)
-        df.loc[mask, 'is_ramadan'] = 1
-    
-    # Eid holidays
-    eid_dates = ['2021-05-13', '2022-05-02', '2023-04-22', '2024-04-10', '2025-03-31',
-                 '2021-07-11', '2022-07-10', '2023-06-29', '2024-06-08', '2025-06-06']
-    df['is_eid'] = df['date'].astype(str).isin(eid_dates).astype(int)
-    
-    # Days to next Eid
-    df['days_to_eid'] = 365
-    for eid_str in eid_dates:
-        eid_date = pd.to_datetime(eid_str)
-        days_diff = (eid_date - df['date']).dt.days
-        df['days_to_eid'] = df['days_to_eid'].where(
-            (days_diff < 0) | (days_diff >= df['days_to_eid']), days_diff
-        )
-    df['near_eid'] = (df['days_to_eid'] <= 7).astype(int)
+def get_training_pool():
+    """Return the shared worker process pool, creating it on first use.
     
-    # National holidays
-    df['is_holiday'] = (
-        ((df['month'] == 1) & (df['day'] == 1)) |
-        ((df['month'] == 8) & (df['day'] == 17)) |
-        ((df['month'] == 12) & (df['day'] == 25))
-    ).astype(int)
-    
-    # Cyclical encoding
-    df['month_sin'] = np.sin(2 * np.pi * df['month'] / 12)
-    df['month_cos'] = np.cos(2 * np.pi * df['month'] / 12)
-    df['dow_sin'] = np.sin(2 * np.pi * df['dayofweek'] / 7)
-    df['dow_cos'] = np.cos(2 * np.pi * df['dayofweek'] / 7)
-    
-    return df
+    Each worker imports the training module as it starts.
+    """
+    global _training_pool
+    with _training_pool_lock:
+        if _training_pool is None:
+            _training_pool = ProcessPoolExecutor(
+                max_workers=TRAIN_WORKERS, initializer=importlib.import_module, initargs=('training',)
+            )
+        return _training_pool
+
+def submit_to_pool(fn, *args, **kwargs):
+    """Submit ``fn`` to the training pool, replacing the pool once if it broke"""
+    global _training_pool
+    pool = get_training_pool()
+    try:
+        return pool.submit(fn, *args, **kwargs)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM); start a fresh pool unless another
+        # caller already did, and retry once
+        with _training_pool_lock:
+            if _training_pool is pool:
+                _training_pool = None
+        return get_training_pool().submit(fn, *args, **kwargs)
 
-def split_product_timeseries(product_df, train_ratio=0.70, val_ratio=0.15):
-    """Split time series maintaining temporal order"""
-    product_df = product_df.sort_values('date').reset_index(drop=True)
-    n = len(product_df)
+def submit_training_job(session_id, **options):
+    """Queue a training run for a session and return its job record.
+
+    ``options`` are forwarded to ``run_training`` (e.g. ``parallel_fit``).
+    If the dataset has a tuned configuration (see ``/api/tune``) it is
+    used as ``model_params``. If the session's dataset was already
+    trained with the same configuration, the cached outputs are reused
+    and the job completes immediately. Store access blocks on disk, so
+    call it from a worker thread.
+    """
+    from training import run_training, training_config_key
     
-    train_end = int(n * train_ratio)
-    val_end = int(n * (train_ratio + val_ratio))
+    session = sessions[session_id]
+    cache_key = None
+    if session.get('dataset_digest'):
+        tuned_key = f"tuned_{session['dataset_digest']}"
+        if 'model_params' not in options and tuned_key in cache:
+            options['model_params'] = cache[tuned_key]['model_params']
+        cache_key = f"train_{session['dataset_digest']}_{training_config_key(**options)}"
     
-    train = product_df.iloc[:train_end].copy()
-    val = product_df.iloc[train_end:val_end].copy()
-    test = product_df.iloc[val_end:].copy()
+    cached = cache_key is not None and cache_key in cache
+    if cached:
+        session_updates = dict(cache[cache_key])
+        response = session_updates.pop('response')
+        future = Future()
+        future.set_result((session_updates, response))
+    else:
+        future = submit_to_pool(run_training, session['df_raw'], **options)
     
-    return train, val, test
+    job_id = f"job_{uuid.uuid4().hex[:12]}"
+    job = {
+        'job_id': job_id,
+        'session_id': session_id,
+        'status': 'queued',
+        'submitted_at': datetime.now().isoformat(),
+        'finished_at': None,
+        'error': None,
+        'result': None,
+        'cached': cached,
+        'tuned': 'model_params' in options,
+        'cache_key': cache_key,
+        'future': future,
+        'done': Future()
+    }
+    jobs[job_id] = job
+    future.add_done_callback(lambda f: _job_finisher.submit(_finish_training_job, job, f))
+    return job
 
-def create_lag_features_per_product(train_df, val_df, test_df):
-    """Create causal lag features per product"""
-    
-    train_with_lags, val_with_lags, test_with_lags = [], [], []
-    
-    for product in train_df['product_name'].unique():
-        train_p = train_df[train_df['product_name'] == product].copy().sort_values('date')
-        val_p = val_df[val_df['product_name'] == product].copy().sort_values('date')
-        test_p = test_df[test_df['product_name'] == product].copy().sort_values('date')
-        
-        def add_lags(df, target='sold'):
-            df = df.copy()
-            series = df[target].copy()
-            
-            for lag in [1, 2, 3, 7, 14, 21, 28]:
-                df[f'{target}_lag{lag}'] = series.shift(lag)
-            
-            for window in [7, 14, 28]:
-                shifted = series.shift(1)
-                df[f'{target}_ma{window}'] = shifted.rolling(window, min_periods=1).mean()
-                df[f'{target}_std{window}'] = shifted.rolling(window, min_periods=1).std()
-                df[f'{target}_max{window}'] = shifted.rolling(window, min_periods=1).max()
-                df[f'{target}_min{window}'] = shifted.rolling(window, min_periods=1).min()
-            
-            df[f'{target}_ema7'] = series.shift(1).ewm(span=7, adjust=False).mean()
-            df[f'{target}_ema14'] = series.shift(1).ewm(span=14, adjust=False).mean()
-            df[f'{target}_trend'] = series.diff(7)
-            
-            return df
-        
-        train_p = add_lags(train_p)
-        
-        train_val = pd.concat([train_p, val_p], ignore_index=True).sort_values('date')
-        train_val = add_lags(train_val)
-        val_p = train_val.iloc[len(train_p):].copy()
-        
-        all_data = pd.concat([train_p, val_p, test_p], ignore_index=True).sort_values('date')
-        all_data = add_lags(all_data)
-        test_p = all_data.iloc[len(train_p) + len(val_p):].copy()
-        
-        train_with_lags.append(train_p)
-        val_with_lags.append(val_p)
-        test_with_lags.append(test_p)
+def _finish_training_job(job, future):
+    """Merge a finished job's output into its session (runs on _job_finisher)"""
+    try:
+        session_updates, response = future.result()
+        # Cached training outputs keep their version: same content, same ETags
+        session_updates.setdefault('model_version', new_session_version())
+        if job['session_id'] in sessions:
+            sessions.update_session(job['session_id'], session_updates)
+            session_versions[job['session_id']] = session_updates['model_version']
+        if job['cache_key'] is not None and not job['cached']:
+            cache[job['cache_key']] = {**session_updates, 'response': response}
+        job['result'] = {'session_id': job['session_id'], **response}
+        job['status'] = 'completed'
+    except Exception as e:
+        job['error'] = str(e)
+        job['status'] = 'failed'
+    finally:
+        job['finished_at'] = datetime.now().isoformat()
+        # The future holds the full training output (models, frames),
+        # which now lives in the session store
+        job['future'] = None
+        job['done'].set_result(None)
+        _prune_jobs()
+
+def _prune_jobs():
+    """Forget the oldest finished jobs beyond MAX_FINISHED_JOBS"""
+    finished = [job_id for job_id, job in list(jobs.items()) if job['finished_at'] is not None]
+    for job_id in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+        jobs.pop(job_id, None)
+
+def job_summary(job):
+    """JSON-safe view of a job record"""
+    status = job['status']
+    future = job['future']
+    # A done future whose job is still queued is being stored
+    if status == 'queued' and future is not None and (future.running() or future.done()):
+        status = 'running'
+    return {
+        'job_id': job['job_id'],
+        'session_id': job['session_id'],
+        'status': status,
+        'submitted_at': job['submitted_at'],
+        'finished_at': job['finished_at'],
+        'error': job['error'],
+        'cached': job['cached'],
+        'tuned': job['tuned']
+    }
+
+# =====================================================================
+# HTTP CACHING
+# =====================================================================
+
+def new_session_version():
+    """Fresh training version for a session whose trained outputs changed"""
+    return uuid.uuid4().hex[:16]
+
+def session_version(session_id):
+    """Training version of a session, or None if it is missing or untrained.
     
-    return pd.concat(train_with_lags), pd.concat(val_with_lags), pd.concat(test_with_lags)
+    Known versions are answered from memory without loading the session.
+    Sessions trained before versions existed get one on first use;
+    sessions without ``split_rows`` (stored by older code) are untrained.
+    """
+    if session_id not in sessions:
+        return None
+    version = session_versions.get(session_id)
+    if version is None:
+        session = sessions[session_id]
+        # Sessions stored before split_rows existed count as untrained
+        if 'split_rows' in session:
+            version = session.get('model_version')
+            if version is None:
+                version = new_session_version()
+                sessions.update_session(session_id, {'model_version': version})
+            session_versions[session_id] = version
+    return version
 
-def calculate_financial_scenario(test_df, production_strategy, strategy_name):
-    """Calculate profit, waste, and service metrics"""
-    tc = test_df.copy()
+def cached_read(request, session_id, endpoint, params, render):
+    """Serve a session read endpoint with ETag revalidation and caching.
     
-    if strategy_name == "Historical Average":
-        hist_avg = tc.groupby('product_name')['sold'].transform('mean')
-        tc['produced_sim'] = np.ceil(hist_avg)
-    elif strategy_name == "Perfect":
-        tc['produced_sim'] = tc['sold']
-    else:
-        tc['produced_sim'] = production_strategy
+    ``render()`` builds the response; it only runs on a cache miss. A
+    matching If-None-Match gets a 304 straight from the session's
+    version, without loading the session.
+    """
+    version = session_version(session_id)
+    etag = make_etag(version, endpoint, params)
+    cache_headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=cache_headers)
     
-    tc['actual_demand'] = tc['sold']
-    tc['sold_actual'] = np.minimum(tc['produced_sim'], tc['actual_demand'])
-    tc['waste'] = np.maximum(tc['produced_sim'] - tc['actual_demand'], 0)
-    tc['stockout'] = np.maximum(tc['actual_demand'] - tc['produced_sim'], 0)
+    key = (session_id, etag)
+    entry = response_cache.get(key)
+    if entry is None:
+        response = render()
+        headers = {name: value for name, value in response.headers.items() if name != 'content-length'}
+        entry = (response.body, response.status_code, {**headers, **cache_headers})
+        response_cache.put(key, entry)
+    body, status_code, headers = entry
+    return Response(content=body, status_code=status_code, headers=headers)
+
+# =====================================================================
+# WARM-UP
+# =====================================================================
+
+def warm_up(workers=True):
+    """Load the ML stack ahead of the first request that needs it.
     
-    tc['revenue'] = tc['sold_actual'] * tc['price']
-    tc['production_cost'] = tc['produced_sim'] * tc['unit_cost']
-    tc['waste_cost'] = tc['waste'] * tc['unit_cost']
-    tc['opportunity_cost'] = tc['stockout'] * (tc['price'] - tc['unit_cost'])
-    tc['total_cost'] = tc['production_cost'] + tc['opportunity_cost']
-    tc['profit'] = tc['revenue'] - tc['total_cost']
+    Imports the ML modules in this process and, with ``workers``,
+    starts the training pool's workers (each imports the training
+    module as it starts, see get_training_pool). Returns the seconds
+    spent on each step and the number of workers that answered.
+    """
+    start = time.perf_counter()
+    import training, forecast, inference, tuning, backtest
+    timings = {'imports_seconds': round(time.perf_counter() - start, 2)}
     
-    return {
-        'total_revenue': float(tc['revenue'].sum()),
-        'production_cost': float(tc['production_cost'].sum()),
-        'waste_cost': float(tc['waste_cost'].sum()),
-        'opportunity_cost': float(tc['opportunity_cost'].sum()),
-        'total_profit': float(tc['profit'].sum()),
-        'total_waste': float(tc['waste'].sum()),
-        'total_stockouts': float(tc['stockout'].sum()),
-        'service_level': float((1 - tc['stockout'].sum() / tc['actual_demand'].sum()) * 100) if tc['actual_demand'].sum() > 0 else 100
-    }
+    if workers:
+        start = time.perf_counter()
+        # The pool starts a worker per submission while none is idle
+        futures = [get_training_pool().submit(os.getpid) for _ in range(TRAIN_WORKERS)]
+        timings['workers'] = len({future.result() for future in futures})
+        timings['workers_seconds'] = round(time.perf_counter() - start, 2)
+    return timings
+
+@app.on_event("startup")
+async def warm_up_on_startup():
+    """With UMKM_WARMUP=1, warm up in the background once the server is up"""
+    if os.environ.get('UMKM_WARMUP', '0') == '1':
+        asyncio.get_running_loop().run_in_executor(None, warm_up)
+
+@app.on_event("shutdown")
+def shutdown_training_pool():
+    if _training_pool is not None:
+        _training_pool.shutdown(wait=False, cancel_futures=True)
 
 # =====================================================================
 # API ENDPOINTS
@@ -208,35 +302,66 @@ def calculate_financial_scenario(test_df, production_strategy, strategy_name):
 async def root():
     return {"message": "UMKM Forecasting API is running", "version": "1.0.0"}
 
-@app.post("/api/upload")
-async def upload_file(file: UploadFile = File(...)):
-    """Upload and process CSV file"""
+@app.post("/api/warmup")
+async def warmup(workers: bool = True):
+    """Load the ML stack now instead of on the first request that needs it (see warm_up)"""
     try:
+        timings = await run_in_threadpool(warm_up, workers)
+        return JSONResponse(content=timings)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Warm-up error: {str(e)}")
+
+async def read_upload(file, stream=False):
+    """Parse an uploaded file into the aggregated daily frame.
+
+    Returns ``(df, digest)``. Re-uploads of identical bytes reuse the
+    cached parsed frame.
+    """
+    digest = await hash_upload(file)
+    upload_key = f"upload_{digest}"
+    
+    if upload_key in cache:
+        cached = await run_in_threadpool(cache.__getitem__, upload_key)
+        return cached['df_raw'], digest
+    
+    head = await file.read(8)
+    await file.seek(0)
+    fmt = detect_upload_format(file.filename, head)
+    
+    if fmt != 'csv':
         contents = await file.read()
-        df_raw = pd.read_csv(io.StringIO(contents.decode('utf-8')))
-        
-        # Parse dates
-        df_raw['date'] = pd.to_datetime(df_raw['date'], format='mixed', dayfirst=True, errors='coerce')
-        df_raw = df_raw.dropna(subset=['date']).sort_values('date').reset_index(drop=True)
-        
-        # Aggregate daily
-        df = df_raw.groupby(['date', 'product_name'], as_index=False).agg({
-            'produced': 'sum',
-            'sold': 'sum',
-            'price': 'mean',
-            'unit_cost': 'mean',
-            'revenue': 'sum',
-            'expense': 'sum'
-        })
+        df = await run_in_threadpool(read_columnar, contents, fmt)
+    elif stream:
+        df = await stream_csv_upload(file, run_sync=run_in_threadpool)
+    else:
+        contents = await file.read()
+        df = await run_in_threadpool(parse_csv, contents)
+    
+    await run_in_threadpool(cache.__setitem__, upload_key, {'df_raw': df})
+    return df, digest
+
+@app.post("/api/upload")
+async def upload_file(file: UploadFile = File(...), stream: bool = False):
+    """Upload and process a CSV, Parquet, Feather or Arrow file.
+
+    With ``stream=true`` a CSV is read in chunks and folded into the
+    daily aggregates as it arrives, keeping memory bounded by the number
+    of day/product keys instead of the file size. Columnar files are
+    read with their column types, skipping text and date parsing.
+    """
+    try:
+        df, digest = await read_upload(file, stream)
         
         # Generate session ID
-        session_id = f"session_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        session_id = f"session_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
         
         # Store data
-        sessions[session_id] = {
+        await run_in_threadpool(sessions.__setitem__, session_id, {
             'df_raw': df,
+            'dataset_digest': digest,
             'upload_time': datetime.now().isoformat()
-        }
+        })
         
         # Basic stats
         stats = {
@@ -264,247 +389,419 @@ async def upload_file(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
 
-@app.post("/api/train/{session_id}")
-async def train_models(session_id: str):
-    """Train ML models on uploaded data"""
+@app.post("/api/append/{session_id}")
+async def append_data(session_id: str, file: UploadFile = File(...), stream: bool = False):
+    """Append new days to a session without retraining from scratch.
+
+    The rows are merged into the session's daily frame. For trained
+    sessions only the new rows are featurized, scored with the current
+    best model and used to continue training the boosted models.
+    """
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
     try:
-        if session_id not in sessions:
-            raise HTTPException(status_code=404, detail="Session not found")
+        from training import append_to_session
         
-        df = sessions[session_id]['df_raw'].copy()
-        
-        # Feature engineering
-        df = add_calendar_features(df)
-        df = df.dropna(subset=['sold'])
-        
-        # Split data per product
-        train_list, val_list, test_list = [], [], []
-        for product in df['product_name'].unique():
-            product_df = df[df['product_name'] == product].copy()
-            train_p, val_p, test_p = split_product_timeseries(product_df)
-            train_list.append(train_p)
-            val_list.append(val_p)
-            test_list.append(test_p)
-        
-        train = pd.concat(train_list, ignore_index=True)
-        val = pd.concat(val_list, ignore_index=True)
-        test = pd.concat(test_list, ignore_index=True)
-        
-        # Encode products
-        le_product = LabelEncoder()
-        le_product.fit(train['product_name'])
-        train['product_encoded'] = le_product.transform(train['product_name'])
-        val['product_encoded'] = le_product.transform(val['product_name'])
-        test['product_encoded'] = le_product.transform(test['product_name'])
-        
-        # Create lag features
-        train, val, test = create_lag_features_per_product(train, val, test)
-        
-        # Feature columns
-        feature_cols = [
-            'year', 'month', 'dayofweek', 'weekofyear', 'quarter', 'dayofyear',
-            'is_weekend', 'is_month_start', 'is_month_end',
-            'is_ramadan', 'is_eid', 'near_eid', 'is_holiday', 'days_to_eid',
-            'product_encoded', 'price', 'unit_cost',
-            'month_sin', 'month_cos', 'dow_sin', 'dow_cos',
-            'sold_lag1', 'sold_lag2', 'sold_lag3', 'sold_lag7', 'sold_lag14', 'sold_lag21', 'sold_lag28',
-            'sold_ma7', 'sold_ma14', 'sold_ma28',
-            'sold_std7', 'sold_std14', 'sold_std28',
-            'sold_max7', 'sold_max14', 'sold_max28',
-            'sold_min7', 'sold_min14', 'sold_min28',
-            'sold_ema7', 'sold_ema14', 'sold_trend'
-        ]
-        
-        # Impute missing values
-        train_stats = {}
-        for product in train['product_name'].unique():
-            train_stats[product] = {}
-            product_train = train[train['product_name'] == product]
-            for col in feature_cols:
-                if col in product_train.columns:
-                    train_stats[product][col] = product_train[col].median()
-        
-        global_stats = {col: train[col].median() for col in feature_cols if col in train.columns}
-        
-        def impute(df_split):
-            df_split = df_split.copy()
-            for product in df_split['product_name'].unique():
-                mask = df_split['product_name'] == product
-                if product in train_stats:
-                    for col in feature_cols:
-                        if col in df_split.columns and df_split.loc[mask, col].isnull().any():
-                            fill_val = train_stats[product].get(col, global_stats.get(col, 0))
-                            df_split.loc[mask, col] = df_split.loc[mask, col].fillna(fill_val)
-            return df_split
-        
-        train = impute(train).dropna(subset=feature_cols + ['sold'])
-        val = impute(val).dropna(subset=feature_cols + ['sold'])
-        test = impute(test).dropna(subset=feature_cols + ['sold'])
-        
-        X_train, y_train = train[feature_cols], train['sold']
-        X_val, y_val = val[feature_cols], val['sold']
-        X_test, y_test = test[feature_cols], test['sold']
-        
-        # Train models
-        models = {
-            'XGBoost': XGBRegressor(
-                n_estimators=200, max_depth=7, learning_rate=0.05,
-                min_child_weight=5, subsample=0.8, colsample_bytree=0.8,
-                random_state=42, n_jobs=-1, verbosity=0
-            ),
-            'Random Forest': RandomForestRegressor(
-                n_estimators=200, max_depth=15, min_samples_split=10,
-                random_state=42, n_jobs=-1
-            ),
-            'Gradient Boosting': GradientBoostingRegressor(
-                n_estimators=200, max_depth=6, learning_rate=0.05,
-                random_state=42
-            )
-        }
+        new_df, digest = await read_upload(file, stream)
+        session = await run_in_threadpool(sessions.__getitem__, session_id)
+        session_updates, response = await run_in_threadpool(append_to_session, session, new_df)
         
-        results = {}
-        for name, model in models.items():
-            model.fit(X_train, y_train)
-            
-            test_pred = np.maximum(model.predict(X_test), 0)
-            
-            results[name] = {
-                'test_mae': float(mean_absolute_error(y_test, test_pred)),
-                'test_rmse': float(np.sqrt(mean_squared_error(y_test, test_pred))),
-                'test_r2': float(r2_score(y_test, test_pred)),
-                'test_mape': float(mean_absolute_percentage_error(y_test, test_pred) * 100)
-            }
+        # The dataset changed; derive a new digest so training results are
+        # cached per (history, appended files) sequence
+        if session.get('dataset_digest'):
+            combined = f"{session['dataset_digest']}+{digest}".encode('utf-8')
+            session_updates['dataset_digest'] = hashlib.sha256(combined).hexdigest()
+        if 'models' in session:
+            session_updates['model_version'] = new_session_version()
         
-        best_model_name = min(results.items(), key=lambda x: x[1]['test_mae'])[0]
-        best_model = models[best_model_name]
-        test_pred = np.maximum(best_model.predict(X_test), 0)
-        
-        # Store in session
-        test['predicted'] = test_pred
-        test['error'] = test['sold'] - test['predicted']
-        test['abs_error'] = np.abs(test['error'])
-        
-        sessions[session_id].update({
-            'train': train,
-            'val': val,
-            'test': test,
-            'models': models,
-            'best_model_name': best_model_name,
-            'best_model': best_model,
-            'le_product': le_product,
-            'feature_cols': feature_cols,
-            'results': results
-        })
+        await run_in_threadpool(sessions.update_session, session_id, session_updates)
+        if 'model_version' in session_updates:
+            session_versions[session_id] = session_updates['model_version']
+        return JSONResponse(content={'session_id': session_id, **response})
         
-        # Calculate financial scenarios
-        scenarios = {}
-        scenarios['Baseline'] = calculate_financial_scenario(test, None, "Historical Average")
-        scenarios['ML Prediction'] = calculate_financial_scenario(test, np.ceil(test_pred), "ML")
-        scenarios['Perfect'] = calculate_financial_scenario(test, test['sold'], "Perfect")
-
-        # Backward-compatible aliases: some frontend code expects keys with underscores
-        # (e.g. 'ML_Prediction'). Create mirrored keys so both variants work without
-        # changing frontend code.
-        try:
-            scenarios['ML_Prediction'] = scenarios.get('ML Prediction')
-            scenarios['Baseline'] = scenarios.get('Baseline')
-            scenarios['Perfect'] = scenarios.get('Perfect')
-        except Exception:
-            # Defensive: if anything goes wrong, ensure scenarios remains a dict
-            pass
-
-        sessions[session_id]['scenarios'] = scenarios
-        
-        # Prepare response
-        response = {
-            'session_id': session_id,
-            'best_model': best_model_name,
-            'split_info': {
-                'train_size': len(train),
-                'val_size': len(val),
-                'test_size': len(test),
-                'train_period': f"{train['date'].min().strftime('%Y-%m-%d')} to {train['date'].max().strftime('%Y-%m-%d')}",
-                'test_period': f"{test['date'].min().strftime('%Y-%m-%d')} to {test['date'].max().strftime('%Y-%m-%d')}"
-            },
-            'model_performance': results,
-            'financial_scenarios': scenarios,
-            'accuracy_breakdown': {
-                'within_5pct': int((test['abs_error'] / test['sold'] * 100 <= 5).sum()),
-                'within_10pct': int((test['abs_error'] / test['sold'] * 100 <= 10).sum()),
-                'within_20pct': int((test['abs_error'] / test['sold'] * 100 <= 20).sum()),
-                'total': len(test)
-            }
-        }
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error appending data: {str(e)}")
+
+@app.post("/api/train/{session_id}")
+async def train_models(session_id: str, parallel: bool = False, cpu_budget: Optional[int] = None,
+                       early_stopping: bool = False, time_budget: Optional[float] = None,
+                       backtest: bool = False):
+    """Train ML models on uploaded data and wait for the result.
+
+    Training runs in the worker pool; this coroutine only awaits it, so
+    other requests keep being served while the models fit. Pass
+    ``parallel=true`` to fit the candidates concurrently within
+    ``cpu_budget`` cores, ``early_stopping=true`` to stop XGBoost and
+    Gradient Boosting on the validation split, ``time_budget`` to cap
+    each model's fit at that many seconds and ``backtest=true`` to pick
+    the best model by a rolling-origin backtest.
+    """
+    try:
+        if session_id not in sessions:
+            raise HTTPException(status_code=404, detail="Session not found")
+        
+        job = await run_in_threadpool(
+            submit_training_job, session_id, parallel_fit=parallel, cpu_budget=cpu_budget,
+            early_stopping=early_stopping, time_budget=time_budget, backtest=backtest
+        )
+        await asyncio.wrap_future(job['done'])
+        if job['status'] == 'failed':
+            raise Exception(job['error'])
         
-        return JSONResponse(content=response)
+        return JSONResponse(content=job['result'])
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Training error: {str(e)}")
 
-@app.get("/api/product-performance/{session_id}")
-async def get_product_performance(session_id: str):
-    """Get per-product performance metrics"""
+@app.post("/api/jobs/train/{session_id}", status_code=202)
+async def submit_training(session_id: str, parallel: bool = False, cpu_budget: Optional[int] = None,
+                          early_stopping: bool = False, time_budget: Optional[float] = None,
+                          backtest: bool = False):
+    """Queue training for a session and return the job id immediately"""
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    job = await run_in_threadpool(
+        submit_training_job, session_id, parallel_fit=parallel, cpu_budget=cpu_budget,
+        early_stopping=early_stopping, time_budget=time_budget, backtest=backtest
+    )
+    return JSONResponse(status_code=202, content=job_summary(job))
+
+@app.post("/api/tune/{session_id}")
+async def tune_models(session_id: str, candidates: int = 9, eta: int = 3, refresh: bool = False):
+    """Search the models' hyperparameters for the session's dataset.
+    
+    Runs successive halving (see tuning.py) in the worker pool. The
+    winning configuration is cached per dataset and used by later
+    trainings of the same data; pass ``refresh=true`` to search again.
+    """
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if candidates < 1 or eta < 2:
+        raise HTTPException(status_code=400, detail="candidates must be >= 1 and eta >= 2")
+    
     try:
-        if session_id not in sessions or 'test' not in sessions[session_id]:
-            raise HTTPException(status_code=404, detail="Session not found or not trained")
-        
-        test = sessions[session_id]['test']
+        session = await run_in_threadpool(sessions.__getitem__, session_id)
+        tuned_key = f"tuned_{session['dataset_digest']}" if session.get('dataset_digest') else None
+        if tuned_key is not None and tuned_key in cache and not refresh:
+            tuned = await run_in_threadpool(cache.__getitem__, tuned_key)
+            return JSONResponse(content={'session_id': session_id, 'cached': True, **tuned})
+        
+        from tuning import tune_hyperparameters
+        future = submit_to_pool(
+            tune_hyperparameters, session['df_raw'], n_candidates=candidates, eta=eta
+        )
+        report = await asyncio.wrap_future(future)
+        if tuned_key is not None:
+            await run_in_threadpool(cache.__setitem__, tuned_key, report)
         
-        product_perf = []
-        for product in sorted(test['product_name'].unique()):
-            product_test = test[test['product_name'] == product]
-            product_perf.append({
-                'product': product,
-                'days': len(product_test),
-                'avg_actual': float(product_test['sold'].mean()),
-                'avg_predicted': float(product_test['predicted'].mean()),
-                'mae': float(product_test['abs_error'].mean()),
-                'mape': float((product_test['abs_error'] / product_test['sold'] * 100).mean())
-            })
+        return JSONResponse(content={'session_id': session_id, 'cached': False, **report})
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Tuning error: {str(e)}")
+
+@app.post("/api/backtest/{session_id}")
+async def backtest_models_endpoint(session_id: str, origins: Optional[int] = None,
+                                   horizon: Optional[int] = None, full: bool = False):
+    """Rolling-origin backtest of the candidate models on the session's data.
+    
+    Returns per-fold and aggregate MAE/RMSE/MAPE. ``origins`` and
+    ``horizon`` default to ``BACKTEST_ORIGINS`` / ``BACKTEST_HORIZON_DAYS``.
+    Fold models are capped at ``BACKTEST_MAX_ROUNDS`` rounds unless
+    ``full=true``. Uses the dataset's tuned configuration when there is
+    one.
+    """
+    from backtest import backtest_dataset, BACKTEST_ORIGINS, BACKTEST_HORIZON_DAYS, BACKTEST_MAX_ROUNDS
+    
+    origins = BACKTEST_ORIGINS if origins is None else origins
+    horizon = BACKTEST_HORIZON_DAYS if horizon is None else horizon
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if origins < 1 or horizon < 1:
+        raise HTTPException(status_code=400, detail="origins and horizon must be positive")
+    
+    try:
+        session = await run_in_threadpool(sessions.__getitem__, session_id)
+        tuned_key = f"tuned_{session['dataset_digest']}" if session.get('dataset_digest') else None
+        model_params = None
+        if tuned_key is not None and tuned_key in cache:
+            model_params = (await run_in_threadpool(cache.__getitem__, tuned_key))['model_params']
+        
+        future = submit_to_pool(
+            backtest_dataset, session['df_raw'], model_params=model_params,
+            n_origins=origins, horizon=horizon, max_rounds=None if full else BACKTEST_MAX_ROUNDS
+        )
+        report = await asyncio.wrap_future(future)
         
-        return JSONResponse(content={'products': product_perf})
+        return JSONResponse(content={'session_id': session_id, **report})
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Backtest error: {str(e)}")
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Get the status of a training job"""
+    if job_id not in jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return JSONResponse(content=job_summary(jobs[job_id]))
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Get the training response of a finished job (202 while still pending)"""
+    if job_id not in jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    job = jobs[job_id]
+    if job['status'] == 'failed':
+        raise HTTPException(status_code=500, detail=f"Training error: {job['error']}")
+    if job['status'] != 'completed':
+        return JSONResponse(status_code=202, content=job_summary(job))
+    
+    return JSONResponse(content=job['result'])
+
+@app.get("/api/forecast/{session_id}")
+async def get_forecast(session_id: str, horizon: int = 7, product: Optional[str] = None):
+    """Forecast daily sales for the next ``horizon`` days after the data ends"""
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found or not trained")
+    if not 1 <= horizon <= MAX_FORECAST_HORIZON:
+        raise HTTPException(status_code=400, detail=f"horizon must be between 1 and {MAX_FORECAST_HORIZON}")
+    
+    try:
+        session = await run_in_threadpool(sessions.__getitem__, session_id)
+        if 'tail_history' not in session:
+            raise HTTPException(status_code=404, detail="Session not found or not trained")
+        products = None
+        if product is not None:
+            if product not in set(session['tail_history']['product_name']):
+                raise HTTPException(status_code=404, detail="Product not found")
+            products = [product]
+        
+        from forecast import forecast_session
+        start = time.perf_counter()
+        dates, products, predictions = await run_in_threadpool(forecast_session, session, horizon, products)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        date_strings = dates.strftime('%Y-%m-%d').tolist()
+        return JSONResponse(content={
+            'session_id': session_id,
+            'model': session['best_model_name'],
+            'horizon': horizon,
+            'dates': date_strings,
+            'forecasts': {
+                name: {
+                    'predicted': predictions[i].tolist(),
+                    'recommended_production': np.ceil(predictions[i]).tolist()
+                }
+                for i, name in enumerate(products)
+            },
+            'elapsed_ms': elapsed_ms
+        })
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+class PredictionRequest(BaseModel):
+    session_id: str
+    product: str
+    date: str
+
+class BatchPredictionRequest(BaseModel):
+    requests: List[PredictionRequest]
+
+@app.post("/api/predict/batch")
+async def predict_batch_endpoint(batch: BatchPredictionRequest):
+    """Predict sales for many (session, product, date) requests at once.
+    
+    Historical dates are scored with one predict call per distinct
+    model; dates after a session's data come from its recursive
+    forecast. Results are returned in request order.
+    """
+    if len(batch.requests) > MAX_BATCH_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ROWS} requests per batch")
+    
+    try:
+        from inference import predict_batch
+        requests = [request.dict() for request in batch.requests]
+        start = time.perf_counter()
+        results, stats = await run_in_threadpool(predict_batch, requests, sessions, MAX_FORECAST_HORIZON)
+        elapsed_ms = (time.perf_counter() - start) * 1000
         
+        return JSONResponse(content={
+            'predictions': results,
+            **stats,
+            'elapsed_ms': elapsed_ms
+        })
+    
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/feature-importance/{session_id}")
-async def get_feature_importance(session_id: str):
-    """Get feature importance from best model"""
+class ScenarioSweepRequest(BaseModel):
+    multipliers: List[float] = DEFAULT_MULTIPLIERS
+    quantiles: List[float] = DEFAULT_QUANTILES
+
+@app.post("/api/scenarios/{session_id}")
+async def sweep_financial_scenarios(session_id: str, sweep: Optional[ScenarioSweepRequest] = None):
+    """Profit, waste, stockouts and service level of many production plans.
+    
+    Plans are the forecast and the product average times each of
+    ``multipliers`` (safety stock above 1), each per-product demand
+    quantile in ``quantiles`` (both from the train and val periods) and
+    perfect foresight, all evaluated on the test period in one
+    vectorized pass. The response lists every plan
+    plus the indices of the profit/waste frontier and the best plan.
+    """
+    sweep = sweep or ScenarioSweepRequest()
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found or not trained")
+    if not sweep.multipliers and not sweep.quantiles:
+        raise HTTPException(status_code=400, detail="At least one multiplier or quantile is required")
+    if 2 * len(sweep.multipliers) + len(sweep.quantiles) > MAX_SCENARIO_PLANS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SCENARIO_PLANS} plans per request")
+    if any(m < 0 for m in sweep.multipliers) or any(not 0 <= q <= 1 for q in sweep.quantiles):
+        raise HTTPException(status_code=400, detail="Multipliers must be >= 0 and quantiles within [0, 1]")
+    
     try:
-        if session_id not in sessions or 'best_model' not in sessions[session_id]:
+        from training import session_split
+        session = await run_in_threadpool(sessions.__getitem__, session_id)
+        if 'split_rows' not in session:
             raise HTTPException(status_code=404, detail="Session not found or not trained")
+        test = session_split(session, 'test')
+        # Averages and quantiles come from the train and val rows only
+        history = session['features'].iloc[:session['split_rows']['val'][1]]
+        result = await run_in_threadpool(
+            sweep_scenarios, test, test['predicted'], history, sweep.multipliers, sweep.quantiles
+        )
+        return JSONResponse(content={'session_id': session_id, **result})
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Scenario error: {str(e)}")
+
+@app.get("/api/product-performance/{session_id}")
+async def get_product_performance(request: Request, session_id: str):
+    """Get per-product performance metrics (ETag-cached, see cached_read)"""
+    if await run_in_threadpool(session_version, session_id) is None:
+        raise HTTPException(status_code=404, detail="Session not found or not trained")
+        
+    def render():
+        session = sessions[session_id]
+        product_perf = session.get('product_performance')
+        if product_perf is None:
+            # Sessions trained before the table was stored
+            from training import session_split, product_performance_table
+            product_perf = product_performance_table(session_split(session, 'test'))
+        return JSONResponse(content={'products': product_perf})
         
-        best_model = sessions[session_id]['best_model']
-        feature_cols = sessions[session_id]['feature_cols']
+    try:
+        return await run_in_threadpool(cached_read, request, session_id, 'product-performance', {}, render)
         
-        feat_imp = pd.DataFrame({
-            'feature': feature_cols,
-            'importance': best_model.feature_importances_
-        }).sort_values('importance', ascending=False).head(15)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/feature-importance/{session_id}")
+async def get_feature_importance(request: Request, session_id: str, product: Optional[str] = None):
+    """Get the best model's top 15 features (ETag-cached, see cached_read).
+    
+    Importances are the permutation importances computed on the
+    validation split after training (see explain.py): the increase in
+    MAE when a feature is shuffled, overall or, with ``product``, on
+    that product's rows. Sessions trained before they were stored fall
+    back to the model's impurity-based importances.
+    """
+    if await run_in_threadpool(session_version, session_id) is None:
+        raise HTTPException(status_code=404, detail="Session not found or not trained")
+        
+    def render():
+        session = sessions[session_id]
+        explanation = session.get('permutation_importance')
+        if explanation is None:
+            if product is not None:
+                raise HTTPException(status_code=404, detail="Per-product importances need a retrain")
+            importance = session['best_model'].feature_importances_.tolist()
+            return JSONResponse(content={**top_features(session['feature_cols'], importance), 'method': 'impurity'})
+        
+        if product is None:
+            importance, baseline_mae = explanation['importance'], explanation['baseline_mae']
+        elif product in explanation['products']:
+            importance = explanation['products'][product]['importance']
+            baseline_mae = explanation['products'][product]['baseline_mae']
+        else:
+            raise HTTPException(status_code=404, detail="Product not found in validation split")
         
         return JSONResponse(content={
-            'features': feat_imp['feature'].tolist(),
-            'importance': feat_imp['importance'].tolist()
+            **top_features(explanation['features'], importance),
+            'method': explanation['method'],
+            'metric': explanation['metric'],
+            'baseline_mae': baseline_mae,
+            'products': list(explanation['products'])
         })
+    
+    try:
+        return await run_in_threadpool(cached_read, request, session_id, 'feature-importance', {'product': product}, render)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/time-series/{session_id}/{product_name}")
-async def get_time_series(session_id: str, product_name: str):
-    """Get time series data for a specific product"""
+async def get_time_series(request: Request, session_id: str, product_name: str,
+                          start: Optional[str] = None, end: Optional[str] = None,
+                          points: Optional[int] = None, format: Optional[str] = None):
+    """Get time series data for a specific product.
+    
+    ``start``/``end`` (YYYY-MM-DD, inclusive) limit the date range and
+    ``points`` downsamples it with largest-triangle-three-buckets.
+    ``format=arrow`` (or ``Accept: application/vnd.apache.arrow.stream``)
+    returns an Arrow IPC stream instead of JSON. The
+    ``X-Total-Points`` header holds the point count before downsampling.
+    Responses are gzip-compressed for clients that accept it and
+    ETag-cached (see cached_read).
+    """
+    if await run_in_threadpool(session_version, session_id) is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if points is not None and points < 3:
+        raise HTTPException(status_code=400, detail="points must be at least 3")
+    if format is None:
+        format = 'arrow' if ARROW_MEDIA_TYPE in request.headers.get('accept', '') else 'json'
+    if format not in ('json', 'arrow'):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'arrow'")
     try:
-        if session_id not in sessions or 'test' not in sessions[session_id]:
-            raise HTTPException(status_code=404, detail="Session not found")
+        for value in (start, end):
+            if value is not None:
+                np.datetime64(value, 'D')
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start and end must be YYYY-MM-DD dates")
+    
+    def render():
+        from training import session_product_test
+        product_test = session_product_test(sessions[session_id], product_name)
+        
+        dates, columns, total = select_series(
+            product_test['date'].to_numpy(),
+            {'actual': product_test['sold'].to_numpy(), 'predicted': product_test['predicted'].to_numpy()},
+            start=start, end=end, points=points
+        )
+        headers = {'X-Total-Points': str(total), 'Vary': 'Accept'}
         
-        test = sessions[session_id]['test']
-        product_test = test[test['product_name'] == product_name].sort_values('date')
+        if format == 'arrow':
+            return Response(content=to_arrow_stream(dates, columns), media_type=ARROW_MEDIA_TYPE, headers=headers)
         
         return JSONResponse(content={
-            'dates': product_test['date'].dt.strftime('%Y-%m-%d').tolist(),
-            'actual': product_test['sold'].tolist(),
-            'predicted': product_test['predicted'].tolist()
-        })
+            'dates': np.datetime_as_string(dates, unit='D').tolist(),
+            'actual': columns['actual'].tolist(),
+            'predicted': columns['predicted'].tolist()
+        }, headers=headers)
+    
+    try:
+        params = {'product': product_name, 'start': start, 'end': end, 'points': points, 'format': format}
+        return await run_in_threadpool(cached_read, request, session_id, 'time-series', params, render)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
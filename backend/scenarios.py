@@ -0,0 +1,151 @@
+"""
+UMKM Forecasting Scenario Engine
+Profit, waste and service level of many production plans in one NumPy pass
+"""
+
+import numpy as np
+import pandas as pd
+
+# Default sweep: multipliers on the forecast and on the product average,
+# and per-product demand quantiles
+DEFAULT_MULTIPLIERS = np.round(np.arange(0.5, 2.0001, 0.05), 2).tolist()
+DEFAULT_QUANTILES = np.round(np.arange(0.05, 1.0, 0.05), 2).tolist()
+
+# Plan-matrix cells evaluated at once (bounds the temporaries)
+MAX_CHUNK_CELLS = 2_000_000
+
+METRICS = [
+    'total_revenue', 'production_cost', 'waste_cost', 'opportunity_cost',
+    'total_profit', 'total_waste', 'total_stockouts', 'service_level'
+]
+
+def scenario_metrics(plans, demand, price, unit_cost):
+    """Financial outcome of each production plan.
+    
+    ``plans`` is a ``(n_plans, n_rows)`` matrix of units produced per row
+    of the evaluation period; ``demand``, ``price`` and ``unit_cost`` are
+    per-row vectors. Units beyond demand are wasted, demand beyond
+    production is a stockout costing the lost margin. Returns a dict of
+    ``(n_plans,)`` arrays, one per name in ``METRICS``.
+    """
+    plans = np.atleast_2d(np.asarray(plans, dtype=np.float64))
+    demand = np.asarray(demand, dtype=np.float64)
+    price = np.asarray(price, dtype=np.float64)
+    unit_cost = np.asarray(unit_cost, dtype=np.float64)
+    
+    n_plans = len(plans)
+    produced, sold = np.empty(n_plans), np.empty(n_plans)
+    revenue, production_cost, sold_cost = np.empty(n_plans), np.empty(n_plans), np.empty(n_plans)
+    chunk = max(1, MAX_CHUNK_CELLS // max(demand.size, 1))
+    for start in range(0, n_plans, chunk):
+        block = plans[start:start + chunk]
+        sold_block = np.minimum(block, demand)
+        part = slice(start, start + len(block))
+        produced[part] = block.sum(axis=1)
+        sold[part] = sold_block.sum(axis=1)
+        revenue[part] = sold_block @ price
+        production_cost[part] = block @ unit_cost
+        sold_cost[part] = sold_block @ unit_cost
+    
+    # Per row: waste = produced - sold, stockout = demand - sold
+    total_demand = demand.sum()
+    opportunity_cost = demand @ (price - unit_cost) - (revenue - sold_cost)
+    stockouts = total_demand - sold
+    return {
+        'total_revenue': revenue,
+        'production_cost': production_cost,
+        'waste_cost': production_cost - sold_cost,
+        'opportunity_cost': opportunity_cost,
+        'total_profit': revenue - production_cost - opportunity_cost,
+        'total_waste': produced - sold,
+        'total_stockouts': stockouts,
+        'service_level': (1 - stockouts / total_demand) * 100 if total_demand > 0 else np.full(n_plans, 100.0)
+    }
+
+def build_plans(test_df, predicted, history_df, multipliers=DEFAULT_MULTIPLIERS, quantiles=DEFAULT_QUANTILES):
+    """Candidate production plans for the rows of ``test_df``.
+    
+    Product averages and quantiles come from ``history_df`` (the rows
+    before the evaluation period), so only the perfect-foresight plan
+    sees the demand it is scored against. Products without history use
+    the statistics of all products. Returns ``(labels, plans)``:
+    ``labels`` is a list of ``{'strategy', 'parameter'}`` dicts and
+    ``plans`` the matching ``(n_plans, n_rows)`` matrix of whole units:
+    
+    - ``forecast``: ceil(predicted * multiplier), i.e. forecast plus a
+      safety-stock margin (or a deliberate under-production)
+    - ``average``: ceil(product average * multiplier), the historical
+      average baseline scaled the same way
+    - ``quantile``: the product's historical demand quantile, rounded up
+    - ``perfect``: actual demand (upper bound on profit)
+    """
+    multipliers = np.asarray(multipliers, dtype=np.float64)
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    predicted = np.asarray(predicted, dtype=np.float64)
+    codes, products = pd.factorize(test_df['product_name'])
+    sold = test_df['sold'].to_numpy(dtype=np.float64)
+    
+    history_codes = pd.Index(products).get_indexer(history_df['product_name'])
+    known = history_codes >= 0
+    history_codes = history_codes[known]
+    history_sold = history_df['sold'].to_numpy(dtype=np.float64)[known]
+    counts = np.bincount(history_codes, minlength=len(products))
+    average = np.divide(
+        np.bincount(history_codes, weights=history_sold, minlength=len(products)), counts,
+        out=np.full(len(products), history_df['sold'].mean()), where=counts > 0
+    )
+    if len(quantiles):
+        by_product = pd.Series(history_sold).groupby(history_codes).quantile(quantiles).unstack()
+        product_quantiles = by_product.reindex(index=range(len(products)), columns=quantiles)
+        product_quantiles = product_quantiles.fillna(history_df['sold'].quantile(quantiles)).to_numpy()
+    else:
+        product_quantiles = np.empty((len(products), 0))
+    
+    plans = np.concatenate([
+        np.ceil(multipliers[:, None] * predicted[None, :]),
+        np.ceil(multipliers[:, None] * average[codes][None, :]),
+        np.ceil(product_quantiles[codes].T),
+        sold[None, :]
+    ])
+    labels = (
+        [{'strategy': 'forecast', 'parameter': float(m)} for m in multipliers]
+        + [{'strategy': 'average', 'parameter': float(m)} for m in multipliers]
+        + [{'strategy': 'quantile', 'parameter': float(q)} for q in quantiles]
+        + [{'strategy': 'perfect', 'parameter': None}]
+    )
+    return labels, plans
+
+def profit_waste_frontier(profit, waste):
+    """Indices of plans no other plan beats on both profit and waste, by waste"""
+    if len(profit) == 0:
+        return np.empty(0, dtype=np.intp)
+    order = np.lexsort((-profit, waste))
+    best_so_far = np.maximum.accumulate(profit[order])
+    improves = np.concatenate([[True], profit[order][1:] > best_so_far[:-1]])
+    return order[improves]
+
+def sweep_scenarios(test_df, predicted, history_df, multipliers=DEFAULT_MULTIPLIERS, quantiles=DEFAULT_QUANTILES):
+    """Evaluate every plan from ``build_plans`` on ``test_df``.
+    
+    Returns a JSON-safe dict with one entry per plan, the indices of the
+    profit/waste frontier and of the most profitable non-perfect plan
+    (None if every plan is perfect foresight).
+    """
+    labels, plans = build_plans(test_df, predicted, history_df, multipliers, quantiles)
+    metrics = scenario_metrics(plans, test_df['sold'], test_df['price'], test_df['unit_cost'])
+    
+    # Perfect foresight is a reference point, not an achievable plan
+    achievable = np.array([label['strategy'] != 'perfect' for label in labels])
+    profit = np.where(achievable, metrics['total_profit'], -np.inf)
+    
+    return {
+        'plans': [
+            {**label, **{name: float(metrics[name][i]) for name in METRICS}}
+            for i, label in enumerate(labels)
+        ],
+        'frontier': np.flatnonzero(achievable)[
+            profit_waste_frontier(profit[achievable], metrics['total_waste'][achievable])
+        ].tolist(),
+        'best_plan': int(np.argmax(profit)) if achievable.any() else None,
+        'rows': len(test_df)
+    }
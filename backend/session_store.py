@@ -0,0 +1,346 @@
+"""
+UMKM Forecasting Session Store
+Keeps upload/training sessions in RAM under a byte budget and on local disk
+"""
+
+import os
+import re
+import time
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+import pandas as pd
+import joblib
+
+from compact_frames import COMPACT_DTYPES_KEY, compact_session, expand_session
+
+SESSION_ID_PATTERN = re.compile(r'^[\w-]+$')
+# Non-frame values live in numbered objects files (see _write_values);
+# sessions written by older code have a single unnumbered one
+OBJECTS_FILE = 'objects.joblib'
+FRAME_EXTENSIONS = ('.parquet', '.pkl')
+
+def objects_file(seq):
+    return f'objects.{seq:06d}.joblib'
+
+def objects_seq(name):
+    """Write order of an objects file, or None for other files"""
+    if name == OBJECTS_FILE:
+        return 0
+    parts = name.split('.')
+    if len(parts) == 3 and parts[0] == 'objects' and parts[1].isdigit() and parts[2] == 'joblib':
+        return int(parts[1])
+    return None
+
+class MemorySessionStore(dict):
+    """Unbounded in-process store; sessions live until the process exits"""
+    
+    def update_session(self, session_id, updates):
+        """Merge ``updates`` into a stored session"""
+        self[session_id].update(updates)
+
+class DiskSessionStore(MutableMapping):
+    """Session store with an LRU RAM tier over a local disk tier.
+    
+    Every session is written through to ``root`` when it is stored or
+    updated: DataFrames as Parquet files (pickle if pyarrow is missing),
+    everything else (models, encoders, dicts) in joblib files.
+    ``update_session`` writes only the updated keys (see _write_values). Hot
+    sessions stay in RAM while their estimated size fits
+    ``memory_budget`` bytes; the least recently used ones are dropped
+    from RAM and reloaded from disk on the next access. With
+    ``ttl_seconds`` set, sessions not accessed for that long are deleted
+    from both tiers. Sessions already on disk are picked up at startup.
+    
+    With ``compact`` set, frames are held and written in compact dtypes
+    (see compact_frames.py); reads restore dates and product names.
+    
+    Values returned by ``store[session_id]`` must not be mutated in
+    place; use ``update_session`` so the disk copy stays current.
+    
+    Disk reads and writes hold a per-session lock, not the store lock, so
+    loading or writing one session never blocks lookups of the others.
+    """
+    
+    def __init__(self, root, memory_budget, ttl_seconds=None, compact=False):
+        self.root = root
+        self.memory_budget = memory_budget
+        self.ttl_seconds = ttl_seconds
+        self.compact = compact
+        self._hot = OrderedDict()
+        self._sizes = {}
+        self._last_access = {}
+        self._lock = threading.RLock()
+        self._io_locks = {}
+        self._groups = {}
+        
+        os.makedirs(root, exist_ok=True)
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if SESSION_ID_PATTERN.match(name) and os.path.isdir(path) and os.listdir(path):
+                self._last_access[name] = os.path.getmtime(path)
+    
+    # -----------------------------------------------------------------
+    # Mapping interface
+    # -----------------------------------------------------------------
+    
+    def __getitem__(self, session_id):
+        return expand_session(self._stored(session_id))
+    
+    def __setitem__(self, session_id, session):
+        if not SESSION_ID_PATTERN.match(session_id):
+            raise ValueError(f"Invalid session id: {session_id}")
+        if self.compact:
+            session = compact_session(session)
+        with self._io_lock(session_id):
+            self._write(session_id, session)
+            self._cache(session_id, session)
+    
+    def __delitem__(self, session_id):
+        with self._lock:
+            if session_id not in self._last_access:
+                raise KeyError(session_id)
+            self._drop(session_id)
+    
+    def __contains__(self, session_id):
+        with self._lock:
+            self._expire()
+            return session_id in self._last_access
+    
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._last_access))
+    
+    def __len__(self):
+        return len(self._last_access)
+    
+    def update_session(self, session_id, updates):
+        """Merge ``updates`` into a session, writing only the updated keys to disk"""
+        frames = [key for key, value in updates.items() if isinstance(value, pd.DataFrame)]
+        compacted = compact_session(updates) if self.compact and frames else updates
+        with self._io_lock(session_id):
+            stored = self._stored(session_id)
+            if self.compact and COMPACT_DTYPES_KEY not in stored:
+                # Stored before compaction was on: compact and rewrite it all
+                session = compact_session({**stored, **updates})
+                self._write(session_id, session)
+            else:
+                if compacted is not updates:
+                    # Dtypes of the replaced frames come from the update
+                    all_dtypes = {
+                        key: dtypes for key, dtypes in stored[COMPACT_DTYPES_KEY].items() if key not in frames
+                    }
+                    compacted[COMPACT_DTYPES_KEY] = {**all_dtypes, **compacted[COMPACT_DTYPES_KEY]}
+                session = {**stored, **compacted}
+                self._write_values(session_id, compacted, session)
+            self._cache(session_id, session)
+    
+    def memory_usage(self):
+        """Estimated bytes held by hot sessions"""
+        with self._lock:
+            return sum(self._sizes.values())
+    
+    def stats(self):
+        """Counts and sizes of both tiers"""
+        with self._lock:
+            return {
+                'hot_sessions': len(self._hot),
+                'total_sessions': len(self._last_access),
+                'memory_bytes': self.memory_usage(),
+                'memory_budget_bytes': self.memory_budget,
+                'bytes_per_session': self.memory_usage() // max(len(self._hot), 1),
+                'compact': self.compact
+            }
+    
+    # -----------------------------------------------------------------
+    # Internals
+    # -----------------------------------------------------------------
+    
+    def _path(self, session_id):
+        return os.path.join(self.root, session_id)
+    
+    def _io_lock(self, session_id):
+        """Lock serializing disk reads and writes of one session"""
+        with self._lock:
+            return self._io_locks.setdefault(session_id, threading.RLock())
+    
+    def _stored(self, session_id):
+        """Session as held in RAM (compacted), loading it from disk if needed"""
+        with self._lock:
+            self._expire()
+            if session_id in self._hot:
+                self._hot.move_to_end(session_id)
+                self._last_access[session_id] = time.time()
+                return self._hot[session_id]
+            if session_id not in self._last_access:
+                raise KeyError(session_id)
+        
+        with self._io_lock(session_id):
+            with self._lock:
+                session = self._hot.get(session_id)
+            if session is None:
+                session = self._load(session_id)
+            self._cache(session_id, session)
+            return session
+    
+    def _cache(self, session_id, session):
+        """Make ``session`` the RAM copy of a session that is on disk"""
+        size = self._measure(session_id, session)
+        with self._lock:
+            self._hot[session_id] = session
+            self._hot.move_to_end(session_id)
+            self._sizes[session_id] = size
+            self._last_access[session_id] = time.time()
+            self._expire()
+            self._enforce_budget()
+    
+    def _dump_frame(self, directory, key, value):
+        """Write one frame into ``directory``; returns its file name"""
+        try:
+            value.to_parquet(os.path.join(directory, f'{key}.parquet'))
+            return f'{key}.parquet'
+        except Exception:
+            value.to_pickle(os.path.join(directory, f'{key}.pkl'))
+            return f'{key}.pkl'
+    
+    def _write_values(self, session_id, values, session):
+        """Write the updated ``values`` of a stored session, now ``session``.
+        
+        Frames replace their own files. The other values go to one new
+        objects file, so values shared between keys (a model that is
+        also the best model) stay one object; objects files holding any
+        updated key are folded into it, so each key lives in one file.
+        Untouched frames and objects files are not rewritten.
+        """
+        final = self._path(session_id)
+        groups = self._groups[session_id]
+        folded = [name for name, keys in groups.items() if keys & set(values)]
+        objects = {key: session[key] for name in folded for key in groups[name]}
+        objects.update(values)
+        for key, value in values.items():
+            if isinstance(value, pd.DataFrame):
+                del objects[key]
+        
+        staging = tempfile.mkdtemp(prefix=f'.{session_id}.', dir=self.root)
+        try:
+            for key, value in values.items():
+                name = self._dump_frame(staging, key, value) if isinstance(value, pd.DataFrame) else None
+                for extension in FRAME_EXTENSIONS:
+                    stale = os.path.join(final, f'{key}{extension}')
+                    if f'{key}{extension}' != name and os.path.exists(stale):
+                        os.remove(stale)
+                if name is not None:
+                    os.replace(os.path.join(staging, name), os.path.join(final, name))
+            if objects:
+                group = objects_file(max(map(objects_seq, groups), default=0) + 1)
+                joblib.dump(objects, os.path.join(staging, group))
+                os.replace(os.path.join(staging, group), os.path.join(final, group))
+            for name in folded:
+                os.remove(os.path.join(final, name))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        
+        groups = {name: keys for name, keys in groups.items() if name not in folded}
+        if objects:
+            groups[group] = set(objects)
+        self._groups[session_id] = groups
+    
+    def _write(self, session_id, session):
+        """Write a session to a fresh directory and swap it in"""
+        final = self._path(session_id)
+        staging = tempfile.mkdtemp(prefix=f'.{session_id}.', dir=self.root)
+        try:
+            objects = {}
+            for key, value in session.items():
+                if isinstance(value, pd.DataFrame):
+                    self._dump_frame(staging, key, value)
+                else:
+                    objects[key] = value
+            joblib.dump(objects, os.path.join(staging, objects_file(1)))
+            
+            if os.path.exists(final):
+                retired = tempfile.mkdtemp(prefix=f'.{session_id}.old.', dir=self.root)
+                os.replace(final, os.path.join(retired, 'session'))
+                os.replace(staging, final)
+                shutil.rmtree(retired, ignore_errors=True)
+            else:
+                os.replace(staging, final)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self._groups[session_id] = {objects_file(1): set(objects)}
+    
+    def _load(self, session_id):
+        path = self._path(session_id)
+        names = os.listdir(path)
+        session, groups = {}, {}
+        for name in sorted((name for name in names if objects_seq(name) is not None), key=objects_seq):
+            objects = joblib.load(os.path.join(path, name))
+            session.update(objects)
+            for keys in groups.values():
+                keys -= set(objects)
+            groups[name] = set(objects)
+        for name in names:
+            key, extension = os.path.splitext(name)
+            if extension == '.parquet':
+                session[key] = pd.read_parquet(os.path.join(path, name))
+            elif extension == '.pkl':
+                session[key] = pd.read_pickle(os.path.join(path, name))
+        self._groups[session_id] = groups
+        return session
+    
+    def _measure(self, session_id, session):
+        """Estimate RAM use: deep frame sizes plus serialized size of everything else"""
+        path = self._path(session_id)
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path) if objects_seq(name) is not None)
+        for value in session.values():
+            if isinstance(value, pd.DataFrame):
+                size += int(value.memory_usage(deep=True).sum())
+        return size
+    
+    def _enforce_budget(self):
+        """Drop least recently used sessions from RAM until under budget"""
+        while len(self._hot) > 1 and sum(self._sizes.values()) > self.memory_budget:
+            session_id, _ = self._hot.popitem(last=False)
+            del self._sizes[session_id]
+    
+    def _expire(self):
+        if self.ttl_seconds is None:
+            return
+        cutoff = time.time() - self.ttl_seconds
+        for session_id in [sid for sid, seen in self._last_access.items() if seen < cutoff]:
+            self._drop(session_id)
+    
+    def _drop(self, session_id):
+        self._hot.pop(session_id, None)
+        self._sizes.pop(session_id, None)
+        self._last_access.pop(session_id, None)
+        self._io_locks.pop(session_id, None)
+        self._groups.pop(session_id, None)
+        shutil.rmtree(self._path(session_id), ignore_errors=True)
+
+def create_session_store(name='sessions', memory_env='UMKM_SESSION_MEMORY_MB', default_memory_mb=256):
+    """Build a store configured by environment variables.
+
+    ``name`` picks the subdirectory and ``memory_env`` the RAM budget
+    variable, so the session store and the upload/training cache share
+    one base directory but have separate budgets.
+    
+    UMKM_SESSION_STORE     'disk' (default) or 'memory'
+    UMKM_SESSION_DIR       base directory (default: <tmp>/umkm_sessions)
+    UMKM_SESSION_TTL_HOURS delete entries idle for this long (default: never)
+    UMKM_SESSION_COMPACT   '1' (default) to keep frames in compact dtypes, '0' to keep them as-is
+    """
+    if os.environ.get('UMKM_SESSION_STORE', 'disk') == 'memory':
+        return MemorySessionStore()
+    
+    base = os.environ.get('UMKM_SESSION_DIR', os.path.join(tempfile.gettempdir(), 'umkm_sessions'))
+    memory_mb = os.environ.get(memory_env, default_memory_mb)
+    memory_budget = int(float(memory_mb) * 1024 * 1024)
+    ttl_hours = os.environ.get('UMKM_SESSION_TTL_HOURS')
+    ttl_seconds = float(ttl_hours) * 3600 if ttl_hours else None
+    compact = os.environ.get('UMKM_SESSION_COMPACT', '1') != '0'
+    return DiskSessionStore(os.path.join(base, name), memory_budget, ttl_seconds, compact)
@@ -0,0 +1,726 @@
+"""
+UMKM Forecasting Training Pipeline
+Feature engineering, model fitting and financial scenarios used by the API
+"""
+
+import os
+import time
+import copy
+import inspect
+import json
+import hashlib
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+# ML Models
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from xgboost import XGBRegressor
+from xgboost.callback import TrainingCallback
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score, mean_absolute_percentage_error
+from sklearn.preprocessing import LabelEncoder
+from joblib import Parallel, delayed
+
+from features import (
+    FEATURE_COLS, add_lag_features, fit_product_medians, impute_product_medians,
+    build_tail_state, extend_lag_features
+)
+from compiled_trees import compile_model
+from calendar_features import add_calendar_features
+from scenarios import scenario_metrics
+from explain import permutation_importance
+
+# Bump when a pipeline change alters trained outputs, so cached
+# training results from older code are not reused
+PIPELINE_VERSION = 6
+
+# run_training options that change how fast it runs but not what it returns
+EXECUTION_OPTIONS = {'parallel_fit', 'cpu_budget'}
+
+# Split names, in the order their rows are stored
+SPLITS = ('train', 'val', 'test')
+
+# Calendar columns joined onto each row (see calendar_features.py)
+CALENDAR_COLS = [
+    'year', 'month', 'day', 'dayofweek', 'dayofyear', 'weekofyear', 'quarter',
+    'is_weekend', 'is_month_start', 'is_month_end',
+    'is_ramadan', 'is_eid', 'days_to_eid', 'near_eid', 'is_holiday',
+    'month_sin', 'month_cos', 'dow_sin', 'dow_cos'
+]
+
+# Boosting rounds / stages added per incremental update on appended days
+APPEND_BOOST_ROUNDS = 10
+
+# Rounds without a validation improvement before early stopping
+EARLY_STOPPING_ROUNDS = 20
+
+# Trees grown between time-budget checks when fitting a random forest
+FOREST_BUDGET_CHUNK = 25
+
+# =====================================================================
+# UTILITY FUNCTIONS
+# =====================================================================
+
+def split_product_timeseries(df, train_ratio=0.70, val_ratio=0.15):
+    """Split each product's history in temporal order.
+    
+    ``df`` must be sorted by date within each product. Returns one split
+    code per row (an index into ``SPLITS``): each product is cut after
+    ``int(n * train_ratio)`` and ``int(n * (train_ratio + val_ratio))``
+    of its ``n`` rows.
+    """
+    grouped = df.groupby('product_name', sort=False)
+    position = grouped.cumcount().to_numpy()
+    n = grouped['date'].transform('size').to_numpy()
+    train_end = (n * train_ratio).astype(int)
+    val_end = (n * (train_ratio + val_ratio)).astype(int)
+    return np.where(position < train_end, 0, np.where(position < val_end, 1, 2)).astype(np.int8)
+    
+def split_row_ranges(codes):
+    """``{split: [start, stop]}`` for split codes sorted in ``SPLITS`` order"""
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(SPLITS)))])
+    return {name: [int(bounds[i]), int(bounds[i + 1])] for i, name in enumerate(SPLITS)}
+    
+def add_prediction_columns(df, predicted):
+    """``df`` with ``predicted``, ``error`` and ``abs_error`` columns"""
+    df = df.assign(predicted=predicted)
+    df['error'] = df['sold'] - df['predicted']
+    df['abs_error'] = np.abs(df['error'])
+    return df
+
+def session_split(session, name):
+    """Rows of one split ('train', 'val' or 'test') of a trained session.
+    
+    Sessions hold a single feature frame ordered train | val | test plus
+    the row range of each split. The test split's prediction columns are
+    derived from the stored predictions on access.
+    """
+    start, stop = session['split_rows'][name]
+    split = session['features'].iloc[start:stop]
+    if name == 'test':
+        split = add_prediction_columns(split, session['test_predicted'])
+    return split
+
+def product_row_ranges(product_names, offset=0):
+    """``{product: [start, stop]}`` for a column where each product's rows are contiguous"""
+    names = np.asarray(product_names)
+    if len(names) == 0:
+        return {}
+    starts = np.flatnonzero(np.r_[True, names[1:] != names[:-1]])
+    stops = np.r_[starts[1:], len(names)]
+    return {
+        str(names[start]): [int(start + offset), int(stop + offset)]
+        for start, stop in zip(starts, stops)
+    }
+
+def product_performance_table(test):
+    """Per-product test metrics (as served by /api/product-performance), sorted by product"""
+    codes, products = pd.factorize(test['product_name'], sort=True)
+    days = np.bincount(codes, minlength=len(products))
+    sold = test['sold'].to_numpy(dtype=np.float64)
+    abs_error = test['abs_error'].to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct_error = abs_error / sold * 100
+    
+    def product_mean(values):
+        return np.bincount(codes, weights=values, minlength=len(products)) / days
+    
+    avg_actual, avg_predicted = product_mean(sold), product_mean(test['predicted'].to_numpy(dtype=np.float64))
+    mae, mape = product_mean(abs_error), product_mean(pct_error)
+    return [
+        {
+            'product': product,
+            'days': int(days[i]),
+            'avg_actual': float(avg_actual[i]),
+            'avg_predicted': float(avg_predicted[i]),
+            'mae': float(mae[i]),
+            'mape': float(mape[i])
+        }
+        for i, product in enumerate(products)
+    ]
+
+def session_product_test(session, product):
+    """Test rows of one product, date-sorted, with prediction columns.
+    
+    Uses the session's per-product row index (an O(rows of the product)
+    slice); sessions trained before the index existed fall back to a
+    scan of the test split.
+    """
+    if 'test_product_rows' not in session:
+        test = session_split(session, 'test')
+        return test[test['product_name'] == product].sort_values('date')
+    
+    test_start = session['split_rows']['test'][0]
+    start, stop = session['test_product_rows'].get(product, [test_start, test_start])
+    rows = session['features'].iloc[start:stop]
+    return add_prediction_columns(rows, session['test_predicted'][start - test_start:stop - test_start])
+
+def calculate_financial_scenario(test_df, production_strategy, strategy_name):
+    """Calculate profit, waste, and service metrics"""
+    if strategy_name == "Historical Average":
+        hist_avg = test_df.groupby('product_name')['sold'].transform('mean')
+        produced = np.ceil(hist_avg)
+    elif strategy_name == "Perfect":
+        produced = test_df['sold']
+    else:
+        produced = production_strategy
+    
+    metrics = scenario_metrics(
+        np.asarray(produced, dtype=np.float64)[None, :],
+        test_df['sold'], test_df['price'], test_df['unit_cost']
+    )
+    return {name: float(values[0]) for name, values in metrics.items()}
+
+# =====================================================================
+# MODEL FITTING
+# =====================================================================
+
+def build_models(model_params=None):
+    """Candidate models, in the order they are reported.
+    
+    ``model_params`` maps model names to parameter overrides, e.g. a
+    tuned configuration from ``tuning.tune_hyperparameters``.
+    """
+    models = {
+        'XGBoost': XGBRegressor(
+            n_estimators=200, max_depth=7, learning_rate=0.05,
+            min_child_weight=5, subsample=0.8, colsample_bytree=0.8,
+            random_state=42, n_jobs=-1, verbosity=0
+        ),
+        'Random Forest': RandomForestRegressor(
+            n_estimators=200, max_depth=15, min_samples_split=10,
+            random_state=42, n_jobs=-1
+        ),
+        'Gradient Boosting': GradientBoostingRegressor(
+            n_estimators=200, max_depth=6, learning_rate=0.05,
+            random_state=42
+        )
+    }
+    for name, params in (model_params or {}).items():
+        models[name].set_params(**params)
+    return models
+
+def split_cpu_budget(models, cpu_budget):
+    """Assign cores to each candidate out of a total budget.
+    
+    Single-threaded estimators (no ``n_jobs`` parameter, e.g. sklearn's
+    GradientBoostingRegressor) get one core each; the multi-threaded ones
+    share the remaining cores evenly, with at least one core apiece.
+    """
+    threaded = [name for name, model in models.items() if 'n_jobs' in model.get_params()]
+    single = len(models) - len(threaded)
+    remaining = max(cpu_budget - single, len(threaded))
+    
+    allocation = {name: 1 for name in models}
+    for name in threaded:
+        allocation[name] = max(1, remaining // len(threaded))
+    return allocation
+
+class TimeBudgetCallback(TrainingCallback):
+    """Stop XGBoost training once ``seconds`` of wall time have passed"""
+    
+    def __init__(self, seconds):
+        super().__init__()
+        self.seconds = seconds
+        self.exceeded = False
+    
+    def before_training(self, model):
+        self.start = time.perf_counter()
+        return model
+    
+    def after_iteration(self, model, epoch, evals_log):
+        self.exceeded = time.perf_counter() - self.start > self.seconds
+        return self.exceeded
+
+class StageMonitor:
+    """``monitor`` for GradientBoostingRegressor.fit.
+    
+    Tracks the validation predictions stage by stage and stops when the
+    validation loss has not improved for ``patience`` stages (if
+    ``X_val`` is given) or after ``seconds`` of wall time (if given).
+    """
+    
+    def __init__(self, X_val=None, y_val=None, patience=EARLY_STOPPING_ROUNDS, seconds=None):
+        self.X_val = None if X_val is None else np.asarray(X_val, dtype=np.float32)
+        self.y_val = None if y_val is None else np.asarray(y_val, dtype=np.float64)
+        self.patience = patience
+        self.seconds = seconds
+        self.best_stage = None
+        self.stopped_by = None
+        self.start = time.perf_counter()
+    
+    def __call__(self, stage, model, fit_locals):
+        if self.X_val is not None:
+            if stage == 0:
+                init = 0.0 if model.init_ == 'zero' else model.init_.predict(self.X_val)
+                self.raw = np.zeros(len(self.X_val)) + init
+                self.best_loss = np.inf
+            self.raw += model.learning_rate * model.estimators_[stage, 0].predict(self.X_val)
+            loss = np.mean((self.y_val - self.raw) ** 2)
+            if loss < self.best_loss:
+                self.best_loss, self.best_stage = loss, stage
+            elif stage - self.best_stage >= self.patience:
+                self.stopped_by = 'early_stopping'
+                return True
+        if self.seconds is not None and time.perf_counter() - self.start > self.seconds:
+            self.stopped_by = 'time_budget'
+            return True
+        return False
+
+def fit_with_budget(model, X_train, y_train, X_val=None, y_val=None, early_stopping=False, time_budget=None):
+    """Fit ``model``, optionally with early stopping and a wall-clock budget.
+    
+    Early stopping watches the loss on ``(X_val, y_val)`` and applies to
+    the boosted models; XGBoost predicts with its best iteration and
+    Gradient Boosting is cut back to its best stage. ``time_budget``
+    (seconds) stops any model once exceeded; the random forest checks it
+    every ``FOREST_BUDGET_CHUNK`` trees. Without either option this is
+    a plain ``model.fit``. Returns ``(rounds_trained, rounds_used,
+    stopped_by)``.
+    """
+    if isinstance(model, XGBRegressor):
+        rounds_max = model.n_estimators
+        params, fit_params = {}, {}
+        budget = TimeBudgetCallback(time_budget) if time_budget else None
+        if early_stopping:
+            params['early_stopping_rounds'] = EARLY_STOPPING_ROUNDS
+            fit_params = {'eval_set': [(X_val, y_val)], 'verbose': False}
+        if budget:
+            params['callbacks'] = [budget]
+        model.set_params(**params)
+        model.fit(X_train, y_train, **fit_params)
+        # Keep the fitted model free of fit-time settings (pickling, appends)
+        model.set_params(early_stopping_rounds=None, callbacks=None)
+        
+        rounds_trained = model.get_booster().num_boosted_rounds()
+        rounds_used = model.best_iteration + 1 if early_stopping else rounds_trained
+        if rounds_trained == rounds_max:
+            stopped_by = None
+        else:
+            stopped_by = 'time_budget' if budget and budget.exceeded else 'early_stopping'
+        return rounds_trained, rounds_used, stopped_by
+    
+    if isinstance(model, GradientBoostingRegressor):
+        if not early_stopping and not time_budget:
+            model.fit(X_train, y_train)
+            return model.n_estimators_, model.n_estimators_, None
+        monitor = StageMonitor(
+            X_val if early_stopping else None, y_val if early_stopping else None,
+            seconds=time_budget
+        )
+        model.fit(X_train, y_train, monitor=monitor)
+        rounds_trained = model.n_estimators_
+        if early_stopping and monitor.best_stage + 1 < rounds_trained:
+            best = monitor.best_stage + 1
+            model.estimators_ = model.estimators_[:best]
+            model.train_score_ = model.train_score_[:best]
+            model.n_estimators_ = best
+            model.set_params(n_estimators=best)
+        return rounds_trained, model.n_estimators_, monitor.stopped_by
+    
+    if isinstance(model, RandomForestRegressor) and time_budget:
+        # Growing the forest in chunks gives the same trees as one fit
+        rounds_max = model.n_estimators
+        start = time.perf_counter()
+        stopped_by = None
+        model.set_params(warm_start=True)
+        for n_trees in range(FOREST_BUDGET_CHUNK, rounds_max + FOREST_BUDGET_CHUNK, FOREST_BUDGET_CHUNK):
+            model.set_params(n_estimators=min(n_trees, rounds_max))
+            model.fit(X_train, y_train)
+            if n_trees < rounds_max and time.perf_counter() - start > time_budget:
+                stopped_by = 'time_budget'
+                break
+        model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+        return len(model.estimators_), len(model.estimators_), stopped_by
+    
+    model.fit(X_train, y_train)
+    rounds = getattr(model, 'n_estimators', 1)
+    return rounds, rounds, None
+
+def fit_and_score(model, X_train, y_train, X_test, y_test,
+                  X_val=None, y_val=None, early_stopping=False, time_budget=None):
+    """Fit one candidate and score it on the test split.
+    
+    Besides the test metrics, reports the rounds (boosting rounds,
+    stages or trees) trained and used, the fit time and an estimate of
+    the fit time saved by stopping before ``n_estimators``.
+    """
+    rounds_max = model.get_params().get('n_estimators', 1)
+    start = time.perf_counter()
+    rounds_trained, rounds_used, stopped_by = fit_with_budget(
+        model, X_train, y_train, X_val, y_val,
+        early_stopping=early_stopping, time_budget=time_budget
+    )
+    fit_seconds = time.perf_counter() - start
+    
+    test_pred = np.maximum(model.predict(X_test), 0)
+    
+    metrics = {
+        'test_mae': float(mean_absolute_error(y_test, test_pred)),
+        'test_rmse': float(np.sqrt(mean_squared_error(y_test, test_pred))),
+        'test_r2': float(r2_score(y_test, test_pred)),
+        'test_mape': float(mean_absolute_percentage_error(y_test, test_pred) * 100),
+        'rounds_max': int(rounds_max),
+        'rounds_trained': int(rounds_trained),
+        'rounds_used': int(rounds_used),
+        'stopped_by': stopped_by,
+        'fit_seconds': round(fit_seconds, 3),
+        'time_saved_seconds': round(fit_seconds / max(rounds_trained, 1) * (rounds_max - rounds_trained), 3)
+    }
+    return model, metrics, test_pred
+
+def fit_models(models, X_train, y_train, X_test, y_test, parallel=False, cpu_budget=None,
+               X_val=None, y_val=None, early_stopping=False, time_budget=None):
+    """Fit all candidates and return ``(models, results, predictions)``.
+    
+    By default the candidates are fitted one after another. With
+    ``parallel=True`` each candidate is fitted in its own process and
+    ``cpu_budget`` (default: all cores) is split between them with
+    ``split_cpu_budget``, so wall time drops to roughly the slowest model.
+    ``X_val``/``y_val``, ``early_stopping`` and ``time_budget`` are
+    passed to ``fit_with_budget``.
+    """
+    fit_options = dict(X_val=X_val, y_val=y_val, early_stopping=early_stopping, time_budget=time_budget)
+    if parallel:
+        cpu_budget = cpu_budget or os.cpu_count() or 1
+        for name, n_jobs in split_cpu_budget(models, cpu_budget).items():
+            if 'n_jobs' in models[name].get_params():
+                models[name].set_params(n_jobs=n_jobs)
+        
+        fitted = Parallel(n_jobs=len(models), backend='loky')(
+            delayed(fit_and_score)(model, X_train, y_train, X_test, y_test, **fit_options)
+            for model in models.values()
+        )
+    else:
+        fitted = [
+            fit_and_score(model, X_train, y_train, X_test, y_test, **fit_options)
+            for model in models.values()
+        ]
+    
+    names = list(models)
+    models = {name: model for name, (model, _, _) in zip(names, fitted)}
+    results = {name: metrics for name, (_, metrics, _) in zip(names, fitted)}
+    predictions = {name: pred for name, (_, _, pred) in zip(names, fitted)}
+    return models, results, predictions
+
+# =====================================================================
+# TRAINING PIPELINE
+# =====================================================================
+
+def training_config_key(**options):
+    """Short digest of the options that affect ``run_training`` outputs.
+    
+    Options left at their ``run_training`` default do not change the key.
+    """
+    defaults = {
+        name: param.default for name, param in inspect.signature(run_training).parameters.items()
+    }
+    config = {
+        key: value for key, value in options.items()
+        if key not in EXECUTION_OPTIONS and value != defaults.get(key)
+    }
+    config['pipeline_version'] = PIPELINE_VERSION
+    payload = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+def prepare_training_frame(df_raw):
+    """Feature frame and fitted preprocessing state for ``run_training``.
+    
+    Returns a dict with ``features`` (rows ordered train | val | test),
+    ``split_rows``, ``le_product``, ``product_stats``/``global_stats``
+    (training medians) and ``tail_history``/``tail_ema``.
+    """
+    # Feature engineering
+    df = add_calendar_features(df_raw, CALENDAR_COLS)
+    df = df.dropna(subset=['sold'])
+    
+    # One panel: products in order of appearance, dates ascending
+    order = pd.Categorical(df['product_name'], categories=df['product_name'].unique()).codes
+    df = df.assign(_order=order).sort_values(['_order', 'date'], kind='stable')
+    df = df.drop(columns=['_order']).reset_index(drop=True)
+    split = split_product_timeseries(df)
+    
+    # Encode products (products without training rows are dropped)
+    le_product = LabelEncoder()
+    le_product.fit(df.loc[split == 0, 'product_name'])
+    known = df['product_name'].isin(le_product.classes_).to_numpy()
+    df, split = df[known].reset_index(drop=True), split[known]
+    df['product_encoded'] = le_product.transform(df['product_name'])
+    
+    # Create lag features over each product's full history (they are causal)
+    df = add_lag_features(df)
+    
+    feature_cols = FEATURE_COLS
+    
+    # Per-product state for featurizing later days (append, forecast)
+    tail_history, tail_ema = build_tail_state(df)
+    
+    # Impute missing values with training medians
+    product_stats, global_stats = fit_product_medians(df[split == 0], feature_cols)
+    df = impute_product_medians(df, product_stats, global_stats)
+    
+    # Keep one frame, rows ordered train | val | test
+    rows = np.flatnonzero(df[feature_cols + ['sold']].notna().all(axis=1).to_numpy())
+    rows = rows[np.argsort(split[rows], kind='stable')]
+    features = df.iloc[rows].reset_index(drop=True)
+    split_rows = split_row_ranges(split[rows])
+    
+    return {
+        'features': features,
+        'split_rows': split_rows,
+        'le_product': le_product,
+        'product_stats': product_stats,
+        'global_stats': global_stats,
+        'tail_history': tail_history,
+        'tail_ema': tail_ema
+    }
+
+def run_training(df_raw, parallel_fit=False, cpu_budget=None, early_stopping=False, time_budget=None,
+                 model_params=None, backtest=False):
+    """Run the full training pipeline on an aggregated daily frame.
+    
+    Returns ``(session_updates, response)``. This is a plain synchronous
+    function so it can run inside a worker process; the caller merges
+    ``session_updates`` into the session and adds the ``session_id`` to
+    ``response``. ``parallel_fit``/``cpu_budget`` are passed to
+    ``fit_models``, as are ``early_stopping`` (stop the boosted models
+    on the validation split) and ``time_budget`` (seconds per model).
+    ``model_params`` overrides the candidates' hyperparameters (see
+    ``build_models``). With ``backtest`` the candidates are also scored
+    over rolling origins (see backtest.py) and the best model is the one
+    with the lowest backtest MAE instead of the lowest test MAE. The
+    best model's permutation importance on the validation split (see
+    explain.py) is stored for the feature-importance endpoint.
+    """
+    prepared = prepare_training_frame(df_raw)
+    features, split_rows = prepared['features'], prepared['split_rows']
+    feature_cols = FEATURE_COLS
+    
+    train, val, test = (features.iloc[slice(*split_rows[name])] for name in SPLITS)
+    X_train, y_train = train[feature_cols], train['sold']
+    X_val, y_val = val[feature_cols], val['sold']
+    X_test, y_test = test[feature_cols], test['sold']
+    
+    # Train models
+    models = build_models(model_params)
+    models, results, predictions = fit_models(
+        models, X_train, y_train, X_test, y_test,
+        parallel=parallel_fit, cpu_budget=cpu_budget,
+        X_val=X_val, y_val=y_val, early_stopping=early_stopping, time_budget=time_budget
+    )
+    
+    backtest_report = None
+    if backtest:
+        from backtest import backtest_models
+        backtest_report = backtest_models(
+            features, build_models(model_params), n_jobs=cpu_budget if parallel_fit else None
+        )
+        best_model_name = backtest_report['best_model']
+    else:
+        best_model_name = min(results.items(), key=lambda x: x[1]['test_mae'])[0]
+    best_model = models[best_model_name]
+    test_pred = predictions[best_model_name]
+    explanation = permutation_importance(
+        best_model, X_val, y_val, val['product_name'], feature_cols,
+        n_jobs=cpu_budget if parallel_fit else None
+    )
+    
+    # Store in session
+    test = add_prediction_columns(test, test_pred)
+    test_start = split_rows['test'][0]
+    
+    session_updates = {
+        'features': features,
+        'split_rows': split_rows,
+        'test_predicted': test_pred,
+        'models': models,
+        'best_model_name': best_model_name,
+        'best_model': best_model,
+        'compiled_model': compile_model(best_model),
+        'le_product': prepared['le_product'],
+        'feature_cols': feature_cols,
+        'results': results,
+        'product_stats': prepared['product_stats'],
+        'global_stats': prepared['global_stats'],
+        'tail_history': prepared['tail_history'],
+        'tail_ema': prepared['tail_ema'],
+        'test_product_rows': product_row_ranges(test['product_name'], offset=test_start),
+        'product_performance': product_performance_table(test),
+        'permutation_importance': explanation
+    }
+    
+    # Calculate financial scenarios
+    scenarios = {}
+    scenarios['Baseline'] = calculate_financial_scenario(test, None, "Historical Average")
+    scenarios['ML Prediction'] = calculate_financial_scenario(test, np.ceil(test_pred), "ML")
+    scenarios['Perfect'] = calculate_financial_scenario(test, test['sold'], "Perfect")
+    
+    # Backward-compatible aliases: some frontend code expects keys with underscores
+    # (e.g. 'ML_Prediction'). Create mirrored keys so both variants work without
+    # changing frontend code.
+    try:
+        scenarios['ML_Prediction'] = scenarios.get('ML Prediction')
+        scenarios['Baseline'] = scenarios.get('Baseline')
+        scenarios['Perfect'] = scenarios.get('Perfect')
+    except Exception:
+        # Defensive: if anything goes wrong, ensure scenarios remains a dict
+        pass
+    
+    session_updates['scenarios'] = scenarios
+    
+    # Prepare response
+    response = {
+        'best_model': best_model_name,
+        'split_info': {
+            'train_size': len(train),
+            'val_size': len(val),
+            'test_size': len(test),
+            'train_period': f"{train['date'].min().strftime('%Y-%m-%d')} to {train['date'].max().strftime('%Y-%m-%d')}",
+            'test_period': f"{test['date'].min().strftime('%Y-%m-%d')} to {test['date'].max().strftime('%Y-%m-%d')}"
+        },
+        'model_performance': results,
+        'financial_scenarios': scenarios,
+        'accuracy_breakdown': {
+            'within_5pct': int((test['abs_error'] / test['sold'] * 100 <= 5).sum()),
+            'within_10pct': int((test['abs_error'] / test['sold'] * 100 <= 10).sum()),
+            'within_20pct': int((test['abs_error'] / test['sold'] * 100 <= 20).sum()),
+            'total': len(test)
+        }
+    }
+    if backtest_report is not None:
+        response['backtest'] = backtest_report
+    
+    return session_updates, response
+
+# =====================================================================
+# INCREMENTAL UPDATES
+# =====================================================================
+
+def update_models_incrementally(models, X_new, y_new, rounds=APPEND_BOOST_ROUNDS):
+    """Continue training the boosted models on new rows only.
+
+    XGBoost gets ``rounds`` more boosting rounds on top of its booster and
+    Gradient Boosting ``rounds`` more stages through ``warm_start``.
+    Random Forest has no incremental mode and is returned unchanged. The
+    input models are not modified. Returns ``(models, updates)`` where
+    ``updates`` describes what happened to each model.
+    """
+    updated, updates = {}, {}
+    for name, model in models.items():
+        if isinstance(model, XGBRegressor):
+            booster = model.get_booster()
+            if booster.attr('best_iteration') is not None:
+                # Early-stopped: continue from the best iteration only
+                booster = booster[:model.best_iteration + 1]
+                booster.set_attr(best_iteration=None, best_score=None)
+            total = booster.num_boosted_rounds() + rounds
+            model = copy.deepcopy(model).set_params(n_estimators=rounds)
+            model.fit(X_new, y_new, xgb_model=booster)
+            model.set_params(n_estimators=total)
+            updates[name] = f'+{rounds} boosting rounds'
+        elif isinstance(model, GradientBoostingRegressor):
+            model = copy.deepcopy(model).set_params(
+                warm_start=True, n_estimators=model.n_estimators_ + rounds
+            )
+            model.fit(X_new, y_new)
+            updates[name] = f'+{rounds} stages'
+        else:
+            updates[name] = 'unchanged'
+        updated[name] = model
+    return updated, updates
+
+def append_to_session(session, new_df):
+    """Merge appended daily rows into a session and update it incrementally.
+
+    ``new_df`` is an aggregated daily frame (see ingest.py) whose rows must
+    be dated after the session's last day for their product. For trained
+    sessions only the new rows are featurized (from the cached tail
+    state), scored with the current best model and added to the test
+    split, and the boosted models continue training on them. Returns
+    ``(session_updates, response)``.
+    """
+    df_raw = session['df_raw']
+    last_dates = df_raw.groupby('product_name')['date'].max()
+    stale = new_df['date'] <= new_df['product_name'].map(last_dates)
+    if stale.any():
+        raise ValueError(
+            f"{int(stale.sum())} rows are not after the last recorded day of their product; "
+            "upload the full history to correct past days"
+        )
+    
+    df = pd.concat([df_raw, new_df], ignore_index=True)
+    df = df.sort_values(['date', 'product_name']).reset_index(drop=True)
+    session_updates = {'df_raw': df}
+    response = {
+        'appended_rows': len(new_df),
+        'total_records': len(df),
+        'date_range': {
+            'start': df['date'].min().strftime('%Y-%m-%d'),
+            'end': df['date'].max().strftime('%Y-%m-%d'),
+            'days': (df['date'].max() - df['date'].min()).days
+        },
+        'model_updates': {},
+        'skipped_products': []
+    }
+    if 'models' not in session:
+        return session_updates, response
+    
+    # Products the encoder has never seen need a full retrain
+    le_product = session['le_product']
+    known = new_df['product_name'].isin(le_product.classes_)
+    response['skipped_products'] = sorted(new_df.loc[~known, 'product_name'].unique().tolist())
+    new_rows = add_calendar_features(new_df[known].dropna(subset=['sold']), CALENDAR_COLS)
+    if new_rows.empty:
+        return session_updates, response
+    new_rows['product_encoded'] = le_product.transform(new_rows['product_name'])
+    
+    new_rows, tail_history, tail_ema = extend_lag_features(
+        session['tail_history'], session['tail_ema'], new_rows
+    )
+    session_updates.update({'tail_history': tail_history, 'tail_ema': tail_ema})
+    
+    feature_cols = session['feature_cols']
+    new_rows = impute_product_medians(new_rows, session['product_stats'], session['global_stats'])
+    new_rows = new_rows.dropna(subset=feature_cols + ['sold'])
+    if new_rows.empty:
+        return session_updates, response
+    X_new, y_new = new_rows[feature_cols], new_rows['sold']
+    
+    # Score the new days before the models see them, then add them to the
+    # test split, keeping each product's test rows contiguous and by date
+    predicted = np.maximum(session['best_model'].predict(X_new), 0)
+    start, stop = session['split_rows']['test']
+    test = pd.concat(
+        [session['features'].iloc[start:stop], new_rows[session['features'].columns]], ignore_index=True
+    )
+    test_predicted = np.concatenate([session['test_predicted'], predicted])
+    rank = pd.Categorical(test['product_name'], categories=test['product_name'].unique()).codes
+    order = np.lexsort((test['date'].to_numpy(), rank))
+    test, test_predicted = test.iloc[order].reset_index(drop=True), test_predicted[order]
+    features = pd.concat([session['features'].iloc[:start], test], ignore_index=True)
+    split_rows = {**session['split_rows'], 'test': [start, stop + len(new_rows)]}
+    
+    models, model_updates = update_models_incrementally(session['models'], X_new, y_new)
+    best_model = models[session['best_model_name']]
+    if model_updates[session['best_model_name']] != 'unchanged' and 'permutation_importance' in session:
+        # The validation split is unchanged but the best model moved on
+        start_val, stop_val = split_rows['val']
+        val = features.iloc[start_val:stop_val]
+        session_updates['permutation_importance'] = permutation_importance(
+            best_model, val[feature_cols], val['sold'], val['product_name'], feature_cols
+        )
+    session_updates.update({
+        'features': features,
+        'split_rows': split_rows,
+        'test_predicted': test_predicted,
+        'test_product_rows': product_row_ranges(test['product_name'], offset=start),
+        'product_performance': product_performance_table(add_prediction_columns(test, test_predicted)),
+        'models': models,
+        'best_model': best_model,
+        'compiled_model': compile_model(best_model)
+    })
+    response['model_updates'] = model_updates
+    response['test_size'] = split_rows['test'][1] - start
+    
+    return session_updates, response
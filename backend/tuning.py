@@ -0,0 +1,176 @@
+"""
+UMKM Forecasting Hyperparameter Search
+Successive halving over the candidate models' hyperparameters
+
+Usage: python backend/tuning.py path/to/data.csv [--candidates 9] [--eta 3] [--jobs N] [--output tuned.json]
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import ParameterSampler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ingest import parse_csv
+from training import FEATURE_COLS, SPLITS, build_models, prepare_training_frame
+
+# Values tried for each model; the defaults from build_models are always
+# the first candidate
+SEARCH_SPACES = {
+    'XGBoost': {
+        'max_depth': [4, 5, 6, 7, 8],
+        'learning_rate': [0.03, 0.05, 0.1, 0.2],
+        'min_child_weight': [1, 3, 5, 10],
+        'subsample': [0.7, 0.8, 1.0],
+        'colsample_bytree': [0.6, 0.8, 1.0]
+    },
+    'Random Forest': {
+        'max_depth': [10, 15, 20, None],
+        'min_samples_split': [2, 5, 10, 20],
+        'min_samples_leaf': [1, 2, 4],
+        'max_features': [1.0, 0.5, 'sqrt']
+    },
+    'Gradient Boosting': {
+        'max_depth': [3, 4, 5, 6, 7],
+        'learning_rate': [0.03, 0.05, 0.1, 0.2],
+        'subsample': [0.7, 0.8, 1.0],
+        'min_samples_leaf': [1, 5, 20]
+    }
+}
+
+def candidate_configs(name, n_candidates, seed=42):
+    """The model's default parameters plus ``n_candidates - 1`` samples of its search space"""
+    space = SEARCH_SPACES[name]
+    defaults = build_models()[name].get_params()
+    configs = [{key: defaults[key] for key in space}]
+    for params in ParameterSampler(space, n_iter=n_candidates * 4, random_state=seed):
+        if len(configs) == n_candidates:
+            break
+        if params not in configs:
+            configs.append(params)
+    return configs
+
+def run_trial(name, params, rows, X_train, y_train, X_val, y_val):
+    """Fit one configuration on the first ``rows`` training rows.
+    
+    Returns ``(validation MAE, fit seconds)``. Each trial uses one core;
+    the pool provides the parallelism.
+    """
+    model = build_models({name: params})[name]
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=1)
+    start = time.perf_counter()
+    model.fit(X_train[:rows], y_train[:rows])
+    seconds = time.perf_counter() - start
+    pred = np.maximum(model.predict(X_val), 0)
+    return float(mean_absolute_error(y_val, pred)), seconds
+
+def successive_halving(X_train, y_train, X_val, y_val, models=None, n_candidates=9, eta=3,
+                       n_jobs=None, seed=42):
+    """Successive halving with the number of training rows as the budget.
+    
+    Every model starts with ``n_candidates`` configurations on a random
+    ``1 / eta ** (rungs - 1)`` share of the training rows; after each
+    rung the best ``1 / eta`` (by validation MAE) go on with ``eta``
+    times the rows, up to all of them. All models' trials of a rung run
+    together on a ``joblib`` process pool with ``n_jobs`` workers
+    (default: all cores). Returns ``(best_params, rungs)``.
+    """
+    models = list(models or SEARCH_SPACES)
+    n_rungs = int(math.log(n_candidates, eta) + 1e-9) + 1
+    
+    # Nested random subsets: each rung's rows contain the previous rung's
+    order = np.random.default_rng(seed).permutation(len(X_train))
+    X_train, y_train = X_train[order], y_train[order]
+    
+    survivors = {name: candidate_configs(name, n_candidates, seed) for name in models}
+    rungs = []
+    with Parallel(n_jobs=n_jobs or os.cpu_count() or 1, backend='loky') as parallel:
+        for rung in range(n_rungs):
+            rows = max(1, len(X_train) // eta ** (n_rungs - 1 - rung))
+            tasks = [(name, params) for name in models for params in survivors[name]]
+            scores = parallel(
+                delayed(run_trial)(name, params, rows, X_train, y_train, X_val, y_val)
+                for name, params in tasks
+            )
+            
+            trials = [
+                {'model': name, 'params': params, 'val_mae': mae, 'fit_seconds': round(seconds, 3)}
+                for (name, params), (mae, seconds) in zip(tasks, scores)
+            ]
+            rungs.append({'rung': rung, 'train_rows': rows, 'trials': trials})
+            
+            for name in models:
+                ranked = sorted((t for t in trials if t['model'] == name), key=lambda t: t['val_mae'])
+                keep = max(1, len(ranked) // eta) if rung < n_rungs - 1 else 1
+                survivors[name] = [t['params'] for t in ranked[:keep]]
+    
+    best_params = {name: survivors[name][0] for name in models}
+    return best_params, rungs
+
+def tune_hyperparameters(df_raw, models=None, n_candidates=9, eta=3, n_jobs=None, seed=42):
+    """Search the candidate models' hyperparameters on a daily frame.
+    
+    Features are computed once with ``prepare_training_frame``; trials
+    fit on the training split and are scored on the validation split.
+    Returns a JSON-safe report whose ``model_params`` can be passed to
+    ``run_training``.
+    """
+    start = time.perf_counter()
+    prepared = prepare_training_frame(df_raw)
+    features, split_rows = prepared['features'], prepared['split_rows']
+    X = features[FEATURE_COLS].to_numpy(dtype=np.float32)
+    y = features['sold'].to_numpy(dtype=np.float64)
+    train, val = (slice(*split_rows[name]) for name in SPLITS[:2])
+    
+    best_params, rungs = successive_halving(
+        X[train], y[train], X[val], y[val], models=models,
+        n_candidates=n_candidates, eta=eta, n_jobs=n_jobs, seed=seed
+    )
+    final = {t['model']: t for t in rungs[-1]['trials']}
+    return {
+        'model_params': best_params,
+        'val_mae': {name: final[name]['val_mae'] for name in best_params},
+        'search': {
+            'candidates': n_candidates,
+            'eta': eta,
+            'trials': sum(len(rung['trials']) for rung in rungs),
+            'seconds': round(time.perf_counter() - start, 2)
+        },
+        'rungs': rungs
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the forecasting models with successive halving")
+    parser.add_argument('csv', help="sales CSV in the upload format")
+    parser.add_argument('--candidates', type=int, default=9)
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--jobs', type=int, default=None)
+    parser.add_argument('--output', help="write the report as JSON to this path")
+    args = parser.parse_args()
+    
+    with open(args.csv, 'rb') as f:
+        df_raw = parse_csv(f.read())
+    
+    report = tune_hyperparameters(df_raw, n_candidates=args.candidates, eta=args.eta, n_jobs=args.jobs)
+    for rung in report['rungs']:
+        print(f"\nRung {rung['rung']}: {rung['train_rows']} training rows")
+        for trial in sorted(rung['trials'], key=lambda t: (t['model'], t['val_mae'])):
+            print(f"  {trial['model']:>18} val MAE {trial['val_mae']:.4f} ({trial['fit_seconds']:.1f}s) {trial['params']}")
+    print(f"\nBest: {json.dumps(report['model_params'], indent=2)}")
+    print(f"{report['search']['trials']} trials in {report['search']['seconds']}s")
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ Goal: Predict optimal daily production to ensure Expenses <= Revenue
 
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -25,6 +25,12 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import mean_absolute_error, mean_squared_error, mean_absolute_percentage_error
 
+from date_parsing import parse_dates
+from calendar_features import (
+    calendar_for, RAMADAN_PERIODS, EID_FITR_DATES, EID_ADHA_DATES, NATIONAL_HOLIDAYS,
+    CALENDAR_START_YEAR, CALENDAR_END_YEAR
+)
+
 # ==============================================================================
 # SECTION 1: DATA LOADING & EDA
 # ==============================================================================
@@ -63,64 +69,21 @@ def load_and_explore_data(filepath):
 # ==============================================================================
 
 def define_external_variables():
-    """Define all external variables (holidays, Ramadan, closures)"""
-    
-    # Ramadan periods
-    ramadan_periods = [
-        ('2021-04-13', '2021-05-12'),
-        ('2022-04-03', '2022-05-01'),
-        ('2023-03-23', '2023-04-21'),
-        ('2024-03-12', '2024-04-09'),
-        ('2025-03-01', '2025-03-30')
-    ]
-    
-    # Eid al-Fitr dates
-    eid_fitr = [
-        '2021-05-13', '2022-05-02', '2023-04-22', '2024-04-10', '2025-03-31'
+    """Holiday dates for Prophet (see calendar_features.py)"""
+    national_holidays = [
+        f'{year}-{month:02d}-{day:02d}'
+        for year in range(CALENDAR_START_YEAR, CALENDAR_END_YEAR + 1)
+        for month, day in NATIONAL_HOLIDAYS
     ]
     
-    # Eid al-Adha dates
-    eid_adha = [
-        '2021-07-11', '2022-07-10', '2023-06-29', '2024-06-08', '2025-06-06'
-    ]
-    
-    # National holidays
-    national_holidays = []
-    for year in range(2021, 2026):
-        national_holidays.extend([
-            f'{year}-01-01',  # New Year
-            f'{year}-08-17',  # Independence Day
-            f'{year}-12-25'   # Christmas
-        ])
-    
     return {
-        'ramadan': ramadan_periods,
-        'eid_fitr': eid_fitr,
-        'eid_adha': eid_adha,
+        'ramadan': RAMADAN_PERIODS,
+        'eid_fitr': EID_FITR_DATES,
+        'eid_adha': EID_ADHA_DATES,
         'national_holidays': national_holidays
     }
 
-def is_in_ramadan(date, ramadan_periods):
-    """Check if date is during Ramadan"""
-    for start, end in ramadan_periods:
-        if pd.to_datetime(start) <= date <= pd.to_datetime(end):
-            return True
-    return False
-
-def calculate_closure_days(eid_dates):
-    """Calculate 5-7 days before and 7 days after Eid"""
-    closure_dates = []
-    for eid in eid_dates:
-        eid_date = pd.to_datetime(eid)
-        # 5-7 days before
-        for i in range(5, 8):
-            closure_dates.append(eid_date - timedelta(days=i))
-        # 7 days after
-        for i in range(1, 8):
-            closure_dates.append(eid_date + timedelta(days=i))
-    return closure_dates
-
-def preprocess_data(df, external_vars):
+def preprocess_data(df):
     """Complete preprocessing pipeline"""
     print("\n" + "="*80)
     print("SECTION 2: DATA PREPROCESSING")
@@ -128,7 +91,7 @@ def preprocess_data(df, external_vars):
     
     # 2.1 Parse dates
     print("\n2.1 Parsing dates...")
-    df['date'] = pd.to_datetime(df['date'], format='mixed', dayfirst=True, errors='coerce')
+    df['date'] = parse_dates(df['date'], dayfirst=True)
     print(f"Unparsed dates: {df['date'].isna().sum()}")
     
     # 2.2 Sort by date
@@ -169,31 +132,18 @@ def preprocess_data(df, external_vars):
     # Day of week (1=Monday, 6=Saturday, 7=Sunday)
     df_complete['day_of_week'] = df_complete['date'].dt.dayofweek + 1
     
-    # Ramadan indicator
-    df_complete['is_ramadan'] = df_complete['date'].apply(
-        lambda x: is_in_ramadan(x, external_vars['ramadan'])
-    )
-    
-    # Eid indicators
-    eid_fitr_dates = pd.to_datetime(external_vars['eid_fitr'])
-    eid_adha_dates = pd.to_datetime(external_vars['eid_adha'])
-    df_complete['is_eid_fitr'] = df_complete['date'].isin(eid_fitr_dates)
-    df_complete['is_eid_adha'] = df_complete['date'].isin(eid_adha_dates)
-    
-    # National holidays
-    national_dates = pd.to_datetime(external_vars['national_holidays'])
-    df_complete['is_national_holiday'] = df_complete['date'].isin(national_dates)
-    
-    # Closure days
-    closure_dates_fitr = calculate_closure_days(external_vars['eid_fitr'])
-    closure_dates_adha = calculate_closure_days(external_vars['eid_adha'])
-    all_closure_dates = set(closure_dates_fitr + closure_dates_adha)
+    # Ramadan, Eid, national holidays and Eid closures from the shared calendar
+    calendar = calendar_for(df_complete['date'])
+    df_complete['is_ramadan'] = calendar['is_ramadan'].astype(bool)
+    df_complete['is_eid_fitr'] = calendar['is_eid_fitr'].astype(bool)
+    df_complete['is_eid_adha'] = calendar['is_eid_adha'].astype(bool)
+    df_complete['is_national_holiday'] = calendar['is_holiday'].astype(bool)
     
     # Sunday closure (except during Ramadan)
     df_complete['is_sunday'] = df_complete['day_of_week'] == 7
     df_complete['is_closed'] = (
         (df_complete['is_sunday'] & ~df_complete['is_ramadan']) |
-        df_complete['date'].isin(all_closure_dates) |
+        calendar['is_eid_closure'].astype(bool) |
         df_complete['is_national_holiday']
     )
     
@@ -449,7 +399,7 @@ def main():
     external_vars = define_external_variables()
     
     # 3. Preprocess data
-    df_processed = preprocess_data(df, external_vars)
+    df_processed = preprocess_data(df)
     
     # 4. Feature engineering
     df_features = create_features(df_processed)
@@ -110,8 +110,9 @@ fileInput.addEventListener('change', (e) => {
 
 // Upload file to backend
 async function handleFileUpload(file) {
-    if (!file.name.endsWith('.csv')) {
-        alert('Please upload a CSV file');
+    const supportedExtensions = ['.csv', '.parquet', '.pq', '.feather', '.arrow', '.arrows'];
+    if (!supportedExtensions.some(ext => file.name.toLowerCase().endsWith(ext))) {
+        alert('Please upload a CSV, Parquet, Feather or Arrow file');
         return;
     }
     